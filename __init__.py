@@ -1,6 +1,6 @@
 from . import models
+from . import reports
 # If we had controllers, we'd add: from . import controllers
-# If we had wizards/reports in their own directory, we'd import them here too.
 
 def post_init_hook(cr, registry):
     """Post-installation hook to migrate existing lots"""
@@ -17,6 +17,8 @@ def post_init_hook(cr, registry):
         
         # Run the migration method
         stock_lot_model._migrate_existing_lots_arrived_quantity()
+        stock_lot_model._backfill_receipt_provenance()
+        env['custom.grade.product.mapping']._populate_from_name_conventions()
         
         _logger.info("Post-install migration completed successfully")
     except Exception as e:
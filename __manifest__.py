@@ -1,12 +1,14 @@
 {
     'name': 'Custom RSFP Module',
-    'version': '1.0.1',
+    'version': '1.0.3',
     'category': 'Quality/Purchase',
     'summary': 'Customized RSFP module for inventory management.',
     'depends': [
         'base',
         'purchase',
+        'purchase_stock',
         'mail',
+        'bus',
         'stock',
         'product',
         'barcodes',
@@ -21,6 +23,7 @@
         'data/lot_sequence_data.xml',
         'data/stock_locations_data.xml',
         'data/warehouse_data.xml',
+        'data/ir_cron_data.xml',
 
         # Menus
         'views/quality_menu.xml',
@@ -34,7 +37,10 @@
         'views/sorting_report_action.xml',
         'views/quality_report_action.xml',
         'views/child_lot_creation_views.xml',
+        'views/grade_product_mapping_views.xml',
         'views/lot_label_wizard_views.xml',
+        'views/negative_quant_repair_views.xml',
+        'views/rsfp_job_views.xml',
         'views/custom_lot_label_button.xml',
 
         # Reports
@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID # type: ignore
+
+# Backfill the receipt provenance stored on stock.lot from existing done purchase receipts
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['stock.lot']._backfill_receipt_provenance()
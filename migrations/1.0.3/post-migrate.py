@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID # type: ignore
+
+# Populate the grade product mapping of existing bulk products from the product naming conventions
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['custom.grade.product.mapping']._populate_from_name_conventions()
@@ -1,13 +1,20 @@
 from . import stock_move_line
+from . import stock_move
 from . import ir_sequence 
+from . import lot_naming
 from . import stock_production_lot
 from . import stock_warehouse
+from . import stock_location
 from . import stock_quant
 from . import product_extension
 from . import purchase_order
+from . import rsfp_job
+from . import report_attachment_mixin
+from . import grade_product_mapping
 from . import quality_sorting
 from . import quality_report
 from . import child_lot_creation
 from . import child_lot_line
 from . import rsfp_enquiry_id
-from . import lot_label_wizard
\ No newline at end of file
+from . import lot_label_wizard
+from . import negative_quant_repair
\ No newline at end of file
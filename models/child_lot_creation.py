@@ -1,14 +1,19 @@
 from odoo import models, fields, api, _ # type: ignore
 from odoo.exceptions import UserError, ValidationError # type: ignore
+from odoo.tools import split_every # type: ignore
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Number of child lots created per batch when splitting a lot
+CHILD_LOT_BATCH_SIZE = 200
+
 class CustomChildLotCreation(models.Model):
     _name = 'custom.child.lot.creation'
     _description = 'Child Lot Creation Report'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'custom.rsfp.job.mixin', 'custom.rsfp.report.attachment.mixin']
     _rec_name = 'name'
+    _background_report_xmlid = 'custom_rsfp_module.action_report_child_lot_creation_detail'
 
     # Header Details
     name = fields.Char(
@@ -158,38 +163,19 @@ class CustomChildLotCreation(models.Model):
 
     @api.depends('parent_lot_id')
     def _compute_root_parent_lot(self):
-        """Find the root parent lot by traversing up the hierarchy"""
+        """Find the root parent lot from the parent lot's materialized genealogy path"""
         for record in self:
             if not record.parent_lot_id:
                 record.root_parent_lot_id = False
                 continue
-            
-            current_lot = record.parent_lot_id
-            # Traverse up to find the root (lot without parent_lot_id)
-            while current_lot.parent_lot_id:
-                current_lot = current_lot.parent_lot_id
-            
-            record.root_parent_lot_id = current_lot
 
-    @api.depends('root_parent_lot_id')
+            record.root_parent_lot_id = record.parent_lot_id._get_root_lot()
+
+    @api.depends('root_parent_lot_id', 'root_parent_lot_id.receipt_purchase_order_id')
     def _compute_purchase_order(self):
-        """Compute purchase order from root parent lot's stock moves"""
+        """Compute purchase order from root parent lot's stored receipt provenance"""
         for record in self:
-            if not record.root_parent_lot_id:
-                record.purchase_order_id = False
-                continue
-            
-            # Find PO through stock move lines
-            move_lines = self.env['stock.move.line'].search([
-                ('lot_id', '=', record.root_parent_lot_id.id),
-                ('state', '=', 'done'),
-                ('move_id.purchase_line_id', '!=', False)
-            ], limit=1)
-            
-            if move_lines and move_lines.move_id.purchase_line_id:
-                record.purchase_order_id = move_lines.move_id.purchase_line_id.order_id
-            else:
-                record.purchase_order_id = False
+            record.purchase_order_id = record.root_parent_lot_id.receipt_purchase_order_id
 
     @api.depends('parent_lot_id', 'source_qty_at_creation', 'state')
     def _compute_source_qty_total(self):
@@ -237,9 +223,11 @@ class CustomChildLotCreation(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                vals['name'] = self.env['ir.sequence'].next_by_code('custom.child.lot.creation.daily') or _('New')
+        # Reserve the daily sequence numbers for the whole batch at once
+        unnamed_vals = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        names = self.env['ir.sequence'].next_by_code_batch('custom.child.lot.creation.daily', len(unnamed_vals))
+        for vals, name in zip(unnamed_vals, names):
+            vals['name'] = name or _('New')
         return super().create(vals_list)
 
     @api.constrains('child_lot_lines')
@@ -266,17 +254,30 @@ class CustomChildLotCreation(models.Model):
 
     def action_confirm(self):
         """Confirm the child lot creation and create child lots"""
+        self._confirm_creation()
+        return self._print_creation_report()
+
+    def _validate_background_confirmation(self):
+        self._validate_creation_data()
+
+    def _run_background_confirmation(self):
+        """Confirmation run by the background job, the PDF being rendered by the job itself"""
+        self.filtered(lambda record: record.state == 'draft')._confirm_creation()
+
+    def _confirm_creation(self):
+        """Create the child lots of the creation reports and mark them confirmed"""
+        self._lock_parent_lots()
         for record in self:
             record._validate_creation_data()
             # Store the source quantity BEFORE any processing
             record.source_qty_at_creation = record.parent_lot_id.product_qty
             record._create_child_lots_sequential()
-            record.write({'state': 'confirmed'})
+
+        self.write({'state': 'confirmed'})
+        for record in self:
             record.message_post(
                 body=_("Child Lot Creation confirmed by %s") % self.env.user.name
             )
-        
-        return self._print_creation_report()
 
     def _validate_creation_data(self):
         """Validate creation data before confirmation"""
@@ -307,60 +308,54 @@ class CustomChildLotCreation(models.Model):
                 raise UserError(_("Location is required for all child lot lines."))
 
     def _create_child_lots_sequential(self):
-        """Create child lots with sequential naming"""
+        """Create child lots with sequential naming, in batches of CHILD_LOT_BATCH_SIZE lines"""
         self.ensure_one()
         
         if self.inventory_processed:
             return True
 
         parent_lot_name = self.parent_lot_id.name
+        lot_ref = self.root_parent_lot_id.name if self.root_parent_lot_id else parent_lot_name
         created_lots = []
         
-        # Find the next sequential number
-        next_number = self._get_next_sequence_number()
-        
-        # Process each valid line
+        # Process the valid lines in chunks, each creating its lots and inventory in one batch
         valid_lines = self.child_lot_lines.filtered(lambda l: l.quantity > 0)
-        
-        for line in valid_lines:
-            # Generate sequential child lot name
-            child_lot_name = f"{parent_lot_name}-{next_number}"
-            
-            # Use same product as parent lot (graded product)
-            target_product = self.product_id
-
-            # Create child lot with arrived_quantity context
-            child_lot = self.env['stock.lot'].with_context(
-                arrived_quantity=line.quantity
-            ).create({
-                'name': child_lot_name,
-                'product_id': target_product.id,
-                'ref': self.root_parent_lot_id.name if self.root_parent_lot_id else parent_lot_name,
-                'parent_lot_id': self.parent_lot_id.id
-            })
-
-            # Add inventory for child lot
-            self.env['stock.quant']._update_available_quantity(
-                target_product,
-                line.location_id,
-                line.quantity,
-                lot_id=child_lot
-            )
-            
-            # IMPORTANT: Reduce parent lot quantity
-            parent_location = self._get_parent_lot_location()
-            self.env['stock.quant']._update_available_quantity(
-                self.parent_lot_id.product_id,
-                parent_location,
-                -line.quantity,
-                lot_id=self.parent_lot_id
-            )
+        if not valid_lines:
+            return True
 
-            # Update line with created lot
-            line.created_lot_id = child_lot.id
+        # Reserve the sequential numbers of all child lots at once
+        next_number = self._get_next_sequence_number(len(valid_lines))
 
-            created_lots.append(child_lot_name)
-            next_number += 1  # Increment for next lot
+        # Use same product as parent lot (graded product)
+        target_product = self.product_id
+
+        for chunk in split_every(CHILD_LOT_BATCH_SIZE, valid_lines.ids, self.env['custom.child.lot.line'].browse):
+            child_lots = self.env['stock.lot'].create([{
+                'name': f"{parent_lot_name}-{next_number + index}",
+                'product_id': target_product.id,
+                'ref': lot_ref,
+                'parent_lot_id': self.parent_lot_id.id,
+                'arrived_quantity': line.quantity,
+            } for index, line in enumerate(chunk)])
+            next_number += len(chunk)
+
+            # Add inventory for the new child lots
+            self.env['stock.quant']._create_new_lot_quants([
+                (target_product, line.location_id, line.quantity, child_lot)
+                for line, child_lot in zip(chunk, child_lots)
+            ])
+
+            # Update lines with created lots, flushed together
+            for line, child_lot in zip(chunk, child_lots):
+                line.created_lot_id = child_lot
+
+            created_lots.extend(child_lots.mapped('name'))
+
+        # IMPORTANT: Reduce parent lot quantity once by the total split quantity, across all locations holding it
+        self.parent_lot_id._apply_drawdown(
+            sum(valid_lines.mapped('quantity')),
+            self.env['stock.location']._get_default_stock_location()
+        )
 
         self.write({'inventory_processed': True})
         
@@ -371,63 +366,13 @@ class CustomChildLotCreation(models.Model):
 
         return True
 
-    def _get_next_sequence_number(self):
-        """Get the next sequential number for child lots"""
-        self.ensure_one()
-        
-        parent_lot_name = self.parent_lot_id.name
-        
-        # Find existing child lots with pattern: parent_name-NUMBER
-        existing_lots = self.env['stock.lot'].search([
-            ('name', 'like', f"{parent_lot_name}-%"),
-            ('parent_lot_id', '=', self.parent_lot_id.id)
-        ])
-        
-        max_number = 0
-        pattern_prefix = f"{parent_lot_name}-"
-        
-        for lot in existing_lots:
-            if lot.name.startswith(pattern_prefix):
-                # Extract the number after the last hyphen
-                suffix = lot.name[len(pattern_prefix):]
-                # Handle multi-level: A-1-2 -> get the first number after parent name
-                if '-' in suffix:
-                    # This is a grandchild (e.g., DM-171125-0001-A-1-2)
-                    # We want the first number (1 in this case)
-                    try:
-                        first_number = int(suffix.split('-')[0])
-                        max_number = max(max_number, first_number)
-                    except ValueError:
-                        continue
-                else:
-                    # This is a direct child (e.g., DM-171125-0001-A-1)
-                    try:
-                        number = int(suffix)
-                        max_number = max(max_number, number)
-                    except ValueError:
-                        continue
-        
-        return max_number + 1
-
-    def _get_parent_lot_location(self):
-        """Get the location where parent lot inventory exists"""
+    def _get_next_sequence_number(self, count=1):
+        """Reserve ``count`` sequential numbers for child lots and return the first one"""
         self.ensure_one()
-        
-        # Find where the parent lot has inventory
-        quants = self.env['stock.quant'].search([
-            ('lot_id', '=', self.parent_lot_id.id),
-            ('quantity', '>', 0)
-        ], limit=1)
-        
-        if quants:
-            return quants.location_id
-        else:
-            # Fallback to stock location
-            return self.env.ref('stock.stock_location_stock')
+        return self.parent_lot_id._reserve_child_indexes(count)
 
     def _print_creation_report(self):
-        """Print child lot creation report"""
-        self.ensure_one()
+        """Print child lot creation report, as one PDF for all records"""
         try:
             report = self.env.ref('custom_rsfp_module.action_report_child_lot_creation_detail')
             return report.report_action(self)
@@ -441,6 +386,7 @@ class CustomChildLotCreation(models.Model):
             if record.inventory_processed:
                 raise UserError(_("Cannot reset to draft: Child lots have already been created. Please create a new record instead."))
             record.write({'state': 'draft'})
+        self._unlink_report_attachments()
         return True
 
     def action_view_all_child_lots(self):
@@ -470,7 +416,7 @@ class CustomChildLotCreation(models.Model):
             raise UserError(_("Cannot add lines to confirmed records."))
         
         # Get default location
-        default_location = self.env.ref('stock.stock_location_stock', raise_if_not_found=False)
+        default_location = self.env['stock.location']._get_default_stock_location()
         if self.parent_lot_id:
             quants = self.env['stock.quant'].search([
                 ('lot_id', '=', self.parent_lot_id.id),
@@ -495,7 +441,7 @@ class CustomChildLotCreation(models.Model):
         """When parent lot changes, add one empty line if no lines exist"""
         if self.parent_lot_id and not self.child_lot_lines:
             # Get default location from parent lot
-            default_location = self.env.ref('stock.stock_location_stock', raise_if_not_found=False)
+            default_location = self.env['stock.location']._get_default_stock_location()
             quants = self.env['stock.quant'].search([
                 ('lot_id', '=', self.parent_lot_id.id),
                 ('quantity', '>', 0)
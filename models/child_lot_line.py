@@ -80,7 +80,7 @@ class CustomChildLotLine(models.Model):
                     res['location_id'] = quants.location_id.id
                 else:
                     # Fallback to stock location
-                    stock_location = self.env.ref('stock.stock_location_stock', raise_if_not_found=False)
+                    stock_location = self.env['stock.location']._get_default_stock_location()
                     if stock_location:
                         res['location_id'] = stock_location.id
         
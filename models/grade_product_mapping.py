@@ -0,0 +1,187 @@
+from odoo import fields, models, api, tools # type: ignore
+from psycopg2 import IntegrityError # type: ignore
+import logging
+
+# This file holds the mapping between a bulk product and the graded (A, B, C) and discarded (DC) products created from it during sorting.
+# Sorting reports resolve their child products through this table instead of searching products by name.
+
+_logger = logging.getLogger(__name__)
+
+GRADE_SELECTION = [
+    ('A', 'Grade A'),
+    ('B', 'Grade B'),
+    ('C', 'Grade C'),
+    ('DC', 'Discarded'),
+]
+
+class CustomGradeProductMapping(models.Model):
+    _name = 'custom.grade.product.mapping'
+    _description = 'Grade Product Mapping'
+    _rec_name = 'product_id'
+    _order = 'bulk_product_tmpl_id, grade'
+
+    bulk_product_tmpl_id = fields.Many2one(
+        'product.template',
+        string='Bulk Product',
+        required=True,
+        index=True,
+        ondelete='cascade',
+        help="Bulk product being sorted"
+    )
+
+    grade = fields.Selection(
+        GRADE_SELECTION,
+        string='Grade',
+        required=True
+    )
+
+    product_id = fields.Many2one(
+        'product.product',
+        string='Graded Product',
+        required=True,
+        ondelete='cascade',
+        domain=[('tracking', '=', 'lot')],
+        help="Product used for the child lots of this grade"
+    )
+
+    _sql_constraints = [
+        ('bulk_product_grade_unique',
+         'UNIQUE (bulk_product_tmpl_id, grade)',
+         'Each grade can only be mapped once per bulk product!')
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        mappings = super(CustomGradeProductMapping, self).create(vals_list)
+        self.env.registry.clear_cache()
+        return mappings
+
+    def write(self, vals):
+        self.env.registry.clear_cache()
+        return super(CustomGradeProductMapping, self).write(vals)
+
+    def unlink(self):
+        self.env.registry.clear_cache()
+        return super(CustomGradeProductMapping, self).unlink()
+
+    @api.model
+    @tools.ormcache('bulk_product_tmpl_id', 'grade')
+    def _get_mapped_product_id(self, bulk_product_tmpl_id, grade):
+        """Return the product id mapped to a bulk product and grade, cached per worker (None if unmapped)"""
+        mapping = self.sudo().search([
+            ('bulk_product_tmpl_id', '=', bulk_product_tmpl_id),
+            ('grade', '=', grade)
+        ], limit=1)
+        return mapping.product_id.id or None
+
+    @api.model
+    def _get_mapped_product(self, bulk_product, grade):
+        """Return the product mapped to a bulk product and grade (empty recordset if unmapped)"""
+        product_id = self._get_mapped_product_id(bulk_product.product_tmpl_id.id, grade)
+        if not product_id:
+            return self.env['product.product']
+        # The product may have been deleted since the mapping was cached
+        return self.env['product.product'].browse(product_id).exists()
+
+    @api.model
+    def _record_mapping(self, bulk_product, grade, product):
+        """Remember the product found for a bulk product and grade, ignoring concurrent duplicates"""
+        if not bulk_product or not product:
+            return
+        try:
+            with self.env.cr.savepoint():
+                self.sudo().create({
+                    'bulk_product_tmpl_id': bulk_product.product_tmpl_id.id,
+                    'grade': grade,
+                    'product_id': product.id,
+                })
+        except IntegrityError:
+            _logger.debug(f"Grade {grade} mapping for {bulk_product.display_name} already recorded")
+
+    @api.model
+    def _get_base_name(self, bulk_name):
+        """Name of a bulk product without its Bulk suffix, as used by the graded product names"""
+        return bulk_name.replace(' - Bulk', '').replace('Bulk', '').strip()
+
+    @api.model
+    def _populate_from_name_conventions(self):
+        """Create the missing mappings of all bulk products from the product naming conventions.
+
+        Product names are read once and indexed in memory with the same patterns the sorting
+        reports used to search with, so the whole catalogue is mapped in a few queries. Like
+        those searches, only active products are considered.
+        """
+        products = self.env['product.product'].search_read(
+            [('tracking', '=', 'lot')], ['name', 'product_tmpl_id'], order='id'
+        )
+        products = [(product['id'], product['product_tmpl_id'][0], product['name'] or '') for product in products]
+
+        existing = {
+            (mapping['bulk_product_tmpl_id'][0], mapping['grade'])
+            for mapping in self.sudo().search_read([], ['bulk_product_tmpl_id', 'grade'])
+        }
+
+        bulk_templates = {}
+        for _product_id, template_id, name in products:
+            if 'bulk' in name.lower():
+                bulk_templates.setdefault(template_id, name)
+
+        # Lowest product id per exact (lowercased) name, and the products mentioning each grade
+        product_by_name = {}
+        for product_id, _tmpl, name in products:
+            product_by_name.setdefault(name.lower(), product_id)
+        grade_candidates = {
+            grade: [(product_id, name.lower()) for product_id, _tmpl, name in products if f'grade {grade.lower()}' in name.lower()]
+            for grade, _label in GRADE_SELECTION if grade != 'DC'
+        }
+
+        vals_list = []
+        for template_id, bulk_name in bulk_templates.items():
+            base_name = self._get_base_name(bulk_name).lower()
+            for grade, _label in GRADE_SELECTION:
+                if (template_id, grade) in existing:
+                    continue
+                product_id = self._match_graded_product(product_by_name, grade_candidates.get(grade, []), base_name, grade)
+                if product_id:
+                    vals_list.append({
+                        'bulk_product_tmpl_id': template_id,
+                        'grade': grade,
+                        'product_id': product_id,
+                    })
+
+        if vals_list:
+            self.sudo().create(vals_list)
+        _logger.info(f"Grade product mapping: {len(vals_list)} mappings created for {len(bulk_templates)} bulk products")
+        return len(vals_list)
+
+    @api.model
+    def _match_graded_product(self, product_by_name, candidates, base_name, grade):
+        """Find the graded product of a lowercased base name.
+
+        Exact names are looked up in ``product_by_name``; otherwise the (id, name) ``candidates``
+        mentioning the grade are scanned once for the same patterns as substrings.
+        """
+        if grade == 'DC':
+            return product_by_name.get(f'{base_name} - discarded')
+
+        grade_label = f'grade {grade.lower()}'
+        patterns = [
+            f'{base_name} - {grade_label}',
+            f'{base_name} {grade_label}',
+            f'{grade_label} {base_name}',
+        ]
+        for pattern in patterns:
+            if pattern in product_by_name:
+                return product_by_name[pattern]
+
+        # Single scan: best matching pattern first, then base name and grade anywhere in the name
+        best_rank, best_product_id = None, None
+        for product_id, name in candidates:
+            if base_name not in name:
+                continue
+            rank = next((index for index, pattern in enumerate(patterns) if pattern in name), len(patterns))
+            if best_rank is None or rank < best_rank:
+                best_rank, best_product_id = rank, product_id
+                if rank == 0:
+                    break
+        return best_product_id
@@ -1,8 +1,25 @@
-from odoo import models, api, fields # type: ignore
+from odoo import models, api, fields, tools # type: ignore
+from psycopg2 import errors # type: ignore
+from datetime import timedelta
 import logging
+from .tracing import get_tracer
 
 _logger = logging.getLogger(__name__)
 
+# Custom sequence codes that reset every day, mapped to the prefix used when formatting them
+DAILY_SEQUENCE_PREFIXES = {
+    'parent.lot.daily.sequence': 'LOT',
+    'custom.sorting.report.daily': 'SR',
+    'custom.quality.report.daily': 'QR',
+    'custom.child.lot.creation.daily': 'CLC',
+}
+
+# Advisory lock namespace making a batch draw from a daily native sequence contiguous
+DAILY_SEQUENCE_LOCK_NAMESPACE = 0x52534653  # 'RSFS'
+
+# Native PostgreSQL sequences known to exist in this worker, as (database name, sequence name) pairs
+_known_daily_sequences = set()
+
 #this sequence is used to generate the proper data sequence for the customized lot sequence generation
 class IrSequence(models.Model):
     _inherit = 'ir.sequence'
@@ -10,78 +27,164 @@ class IrSequence(models.Model):
     @api.model
     def next_by_code(self, sequence_code, sequence_date=None):
         """Override to handle daily reset for custom sequences"""
-        _logger.info(f"=== SEQUENCE REQUESTED: {sequence_code} ===")
+        trace = get_tracer(self.env, 'ir.sequence')
+        trace("=== SEQUENCE REQUESTED: %s ===", sequence_code)
 
-        # Handle parent lot sequence
-        if sequence_code == 'parent.lot.daily.sequence':
-            result = self._get_daily_sequence(sequence_code, 'LOT')
-            _logger.info(f"LOT sequence result: {result}")
-            return result
-        
-        # Handle sorting report sequence
-        elif sequence_code == 'custom.sorting.report.daily':
-            result = self._get_daily_sequence(sequence_code, 'SR')
-            _logger.info(f"SR sorting sequence result: {result}")
-            return result
-        
-        # Handle quality report sequence
-        elif sequence_code == 'custom.quality.report.daily':
-            result = self._get_daily_sequence(sequence_code, 'QR')
-            _logger.info(f"QR report sequence result: {result}")
-            return result
-        
-        # Handle child lot creation sequence
-        elif sequence_code == 'custom.child.lot.creation.daily':
-            result = self._get_daily_sequence(sequence_code, 'CLC')
-            _logger.info(f"CLC sequence result: {result}")
+        # Handle the daily custom sequences (LOT, SR, QR, CLC)
+        prefix_code = DAILY_SEQUENCE_PREFIXES.get(sequence_code)
+        if prefix_code:
+            result = self._get_daily_sequence(sequence_code, prefix_code)
+            trace("%s sequence result: %s", prefix_code, result)
             return result
-        
-        _logger.info(f"Using default sequence handling for: {sequence_code}")
+
+        trace("Using default sequence handling for: %s", sequence_code)
         return super(IrSequence, self).next_by_code(sequence_code, sequence_date)
 
+    @api.model
+    def next_by_code_batch(self, sequence_code, count, sequence_date=None):
+        """Reserve ``count`` numbers of a sequence at once and return them formatted, in order.
+
+        Daily custom sequences reserve the whole batch in a single round trip; any other
+        code falls back to one next_by_code call per number.
+        """
+        if count <= 0:
+            return []
+
+        prefix_code = DAILY_SEQUENCE_PREFIXES.get(sequence_code)
+        if not prefix_code:
+            return [self.next_by_code(sequence_code, sequence_date) for _ in range(count)]
+
+        return self._get_daily_sequence_batch(sequence_code, prefix_code, count)
+
     @api.model
     def _get_daily_sequence(self, sequence_code, prefix_code):
         """Get next sequence number with daily reset and custom formatting"""
-        _logger.info(f"=== Getting daily sequence for {sequence_code} with prefix {prefix_code} ===")
-        
-        sequence = self.search([('code', '=', sequence_code)], limit=1)
-        if not sequence:
+        result = self._get_daily_sequence_batch(sequence_code, prefix_code, 1)
+        return result[0] if result else False
+
+    @api.model
+    def _get_daily_sequence_batch(self, sequence_code, prefix_code, count):
+        """Get the next ``count`` daily numbers with custom formatting.
+
+        Numbers come from a native PostgreSQL sequence dedicated to the sequence and the
+        current day, so no shared row is updated and concurrent workers cannot hit
+        serialization failures. A batch is always a block of consecutive numbers.
+        """
+        sequence_info = self._get_daily_sequence_info(sequence_code)
+        if not sequence_info:
             _logger.error(f"Sequence {sequence_code} not found!")
-            return False
-        
+            return []
+        sequence_id, padding = sequence_info
+
         today = fields.Date.today()
-        date_str = today.strftime('%d%m%y')  # Format: DDMMYY
-        
-        # Check if we have a date range for today
-        date_range = self.env['ir.sequence.date_range'].search([
-            ('sequence_id', '=', sequence.id),
-            ('date_from', '<=', today),
-            ('date_to', '>=', today)
-        ], limit=1)
-        
-        if not date_range:
-            # Create new date range for today
-            _logger.info(f"Creating new date range for {sequence_code} on {today}")
-            date_range = self.env['ir.sequence.date_range'].create({
-                'sequence_id': sequence.id,
-                'date_from': today,
-                'date_to': today,
-                'number_next': 1,
-            })
-        
-        # Get next number and format it
-        number = date_range.number_next
-        date_range.number_next += 1
-        
-        # Format with padding
-        formatted_number = str(number).zfill(sequence.padding)
-        
+        seq_name = self._ensure_daily_native_sequence(sequence_id, today)
+
+        first = self._draw_daily_numbers(sequence_id, seq_name, count)
+        if first is None:
+            # The sequence was dropped since this worker created it (database restored, manual drop)
+            _logger.warning(f"Daily sequence {seq_name} vanished, creating it again")
+            _known_daily_sequences.discard((self.env.cr.dbname, seq_name))
+            seq_name = self._ensure_daily_native_sequence(sequence_id, today)
+            first = self._draw_daily_numbers(sequence_id, seq_name, count)
+
+        return [self._format_daily_number(prefix_code, today, number, padding) for number in range(first, first + count)]
+
+    @api.model
+    def _draw_daily_numbers(self, sequence_id, seq_name, count):
+        """Reserve ``count`` consecutive numbers of a native sequence in one round trip and return the first.
+
+        The sequence's advisory lock keeps other draws from interleaving between nextval() and
+        setval(). The sequence is resolved with to_regclass(), so a missing sequence returns
+        None instead of aborting the transaction.
+        """
+        self.env.cr.execute("""
+            SELECT pg_advisory_xact_lock(%s, %s);
+            SELECT setval(to_regclass(%s), nextval(to_regclass(%s)) + %s - 1);
+        """, (DAILY_SEQUENCE_LOCK_NAMESPACE, sequence_id, seq_name, seq_name, count))
+        last = self.env.cr.fetchone()[0]
+        return None if last is None else last - count + 1
+
+    @api.model
+    @tools.ormcache('sequence_code')
+    def _get_daily_sequence_info(self, sequence_code):
+        """Return (id, padding) of the ir.sequence behind a daily code, cached per worker"""
+        sequence = self.sudo().search([('code', '=', sequence_code)], limit=1)
+        if not sequence:
+            return None
+        return sequence.id, sequence.padding
+
+    @api.model
+    def _format_daily_number(self, prefix_code, day, number, padding):
+        """Format a daily number as XXXX for lots or PREFIX-DDMMYY-XXXX for reports"""
+        formatted_number = str(number).zfill(padding)
+
         # For lot sequences, return just the number (formatting done in lot model)
         if prefix_code == 'LOT':
-            _logger.info(f"Returning lot sequence number: {formatted_number}")
             return formatted_number
-        
+
         # For report sequences, return full formatted name
-        full_name = f"{prefix_code}-{date_str}-{formatted_number}"
-        _logger.info(f"Generated sequence: {full_name}")
-        return full_name
\ No newline at end of file
+        return f"{prefix_code}-{day.strftime('%d%m%y')}-{formatted_number}"
+
+    @api.model
+    def _get_daily_native_sequence_name(self, sequence_id, day):
+        """Name of the native PostgreSQL sequence holding a daily sequence's numbers for a day"""
+        return 'rsfp_daily_seq_%03d_%s' % (sequence_id, day.strftime('%Y%m%d'))
+
+    @api.model
+    def _ensure_daily_native_sequence(self, sequence_id, day):
+        """Make sure the native sequence for the given day exists and return its name.
+
+        The sequence is created in its own short transaction, so concurrent workers never
+        wait on each other's uncommitted DDL and the day's counter survives a rollback of
+        the caller. Numbering resumes after any legacy ir.sequence.date_range of the day.
+        """
+        seq_name = self._get_daily_native_sequence_name(sequence_id, day)
+        # Databases served by the same worker share sequence ids, so the cache is keyed by database too
+        cache_key = (self.env.cr.dbname, seq_name)
+        if cache_key in _known_daily_sequences:
+            return seq_name
+
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                SELECT MAX(number_next) FROM ir_sequence_date_range
+                 WHERE sequence_id = %s AND date_from <= %s AND date_to >= %s
+            """, (sequence_id, day, day))
+            start = cr.fetchone()[0] or 1
+            try:
+                with cr.savepoint(flush=False):
+                    cr.execute("CREATE SEQUENCE IF NOT EXISTS %s INCREMENT BY 1 START WITH %d" % (seq_name, start))
+            except (errors.UniqueViolation, errors.DuplicateTable):
+                # Another worker created the same day's sequence concurrently
+                _logger.debug(f"Daily sequence {seq_name} created concurrently")
+            self._drop_stale_daily_native_sequences(cr, sequence_id, day)
+
+        _known_daily_sequences.add(cache_key)
+        return seq_name
+
+    @api.model
+    def _drop_stale_daily_native_sequences(self, cr, sequence_id, day):
+        """Drop the native sequences of days before yesterday for the given sequence"""
+        prefix = 'rsfp_daily_seq_%03d_' % sequence_id
+        cutoff = self._get_daily_native_sequence_name(sequence_id, day - timedelta(days=1))
+        cr.execute("""
+            SELECT relname FROM pg_class
+             WHERE relkind = 'S' AND relname >= %s AND relname < %s
+        """, (prefix, cutoff))
+        for (stale_name,) in cr.fetchall():
+            cr.execute("DROP SEQUENCE IF EXISTS %s" % stale_name)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        sequences = super(IrSequence, self).create(vals_list)
+        # A daily code requested before its sequence existed is cached as missing
+        self.env.registry.clear_cache()
+        return sequences
+
+    def write(self, vals):
+        if 'code' in vals or 'padding' in vals:
+            self.env.registry.clear_cache()
+        return super(IrSequence, self).write(vals)
+
+    def unlink(self):
+        self.env.registry.clear_cache()
+        return super(IrSequence, self).unlink()
@@ -49,6 +49,10 @@ class LotLabelWizard(models.TransientModel):
         LABEL_WIDTH = 812  # 100mm @ 203 DPI
         LABEL_HEIGHT = 406 # 50mm @ 203 DPI
 
+        # Purchase and processing information of all lots, fetched once
+        purchase_info = self.lot_ids.filtered(lambda lot: not lot.parent_lot_id)._get_purchase_order_info_batch()
+        processing_info = self.lot_ids._get_processing_info_batch()
+
         for lot in self.lot_ids:
             # Data Sanitation
             product_name = (lot.product_id.name or "").replace('^', '').replace('~', '')[:60]
@@ -77,7 +81,7 @@ class LotLabelWizard(models.TransientModel):
 
             if not lot.parent_lot_id:
                 # CASE: BULK RAW MATERIAL
-                po_info = lot._get_purchase_order_info() or {}
+                po_info = purchase_info.get(lot.id, {})
                 
                 label_zpl += f"^FO{LEFT_X},{BASE_Y}^A0N,{FONT_SIZE}^FB{LEFT_WIDTH},2,0,L,0^FDProduct: {product_name}^FS"
                 label_zpl += f"^FO{LEFT_X},{BASE_Y+60}^A0N,{FONT_SIZE}^FB{LEFT_WIDTH},1,0,L,0^FDLot No: {lot_name}^FS"
@@ -88,7 +92,7 @@ class LotLabelWizard(models.TransientModel):
                 label_zpl += f"^FO{RIGHT_X},{BASE_Y+70}^A0N,{FONT_SIZE}^FB{RIGHT_WIDTH},1,0,L,0^FDDate: {po_info.get('received_date', 'N/A')}^FS"
             else:
                 # CASE: GRADED PRODUCT
-                proc_info = lot._get_processing_info() or {}
+                proc_info = processing_info.get(lot.id, {})
                 
                 label_zpl += f"^FO{LEFT_X},{BASE_Y}^A0N,{FONT_SIZE}^FB{LEFT_WIDTH},2,0,L,0^FDProduct: {product_name}^FS"
                 label_zpl += f"^FO{LEFT_X},{BASE_Y+60}^A0N,{FONT_SIZE}^FB{LEFT_WIDTH},1,0,L,0^FDLot No: {lot_name}^FS"
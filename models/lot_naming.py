@@ -0,0 +1,109 @@
+from odoo import fields, models, api, tools # type: ignore
+import logging
+
+# This file holds the single lot naming engine used by stock.lot and stock.move.line.
+# Lot names follow a configurable format (ABBR-DDMMYY-XXXX by default) and take their number from the daily lot sequence.
+
+_logger = logging.getLogger(__name__)
+
+LOT_SEQUENCE_CODE = 'parent.lot.daily.sequence'
+DEFAULT_LOT_NAME_FORMAT = '{abbreviation}-{date}-{number}'
+
+# Placeholder shown instead of the sequence number while lot naming is deferred (e.g. DM-161025-####)
+LOT_NAME_PREVIEW_CHAR = '#'
+
+class CustomLotNaming(models.AbstractModel):
+    _name = 'custom.lot.naming'
+    _description = 'Lot Naming Engine'
+
+    @api.model
+    @tools.ormcache('product_id')
+    def _get_product_lot_abbreviation(self, product_id):
+        """Return the lot abbreviation of a product, cached per worker (None if the product does not exist)"""
+        product = self.env['product.product'].sudo().browse(product_id)
+        if not product.exists():
+            return None
+        return product.product_tmpl_id.lot_abbreviation or 'XX'
+
+    @api.model
+    def _get_lot_name_format(self):
+        """Format of generated lot names, overridable with the custom_rsfp_module.lot_name_format parameter.
+
+        Available placeholders: {abbreviation}, {date} (DDMMYY) and {number} (zero padded).
+        """
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'custom_rsfp_module.lot_name_format', DEFAULT_LOT_NAME_FORMAT
+        )
+
+    @api.model
+    def _format_lot_name(self, abbreviation, day, number):
+        """Build a lot name from its parts; override to plug in a different naming scheme"""
+        return self._get_lot_name_format().format(
+            abbreviation=abbreviation,
+            date=day.strftime('%d%m%y'),
+            number=number,
+        )
+
+    @api.model
+    def _get_lot_number_padding(self):
+        sequence_info = self.env['ir.sequence']._get_daily_sequence_info(LOT_SEQUENCE_CODE)
+        return sequence_info[1] if sequence_info else 4
+
+    @api.model
+    def _generate_names(self, product_ids):
+        """Generate one lot name per product id, reserving all sequence numbers at once.
+
+        Returns a list aligned with ``product_ids``; entries are False for missing products.
+        """
+        abbreviations = [self._get_product_lot_abbreviation(product_id) if product_id else None
+                         for product_id in product_ids]
+        today = fields.Date.today()
+
+        numbers = self.env['ir.sequence'].next_by_code_batch(
+            LOT_SEQUENCE_CODE, sum(1 for abbreviation in abbreviations if abbreviation)
+        )
+        if not numbers:
+            _logger.error("Sequence not found!")
+        numbers = iter(numbers)
+
+        names = []
+        for abbreviation in abbreviations:
+            if not abbreviation:
+                names.append(False)
+                continue
+            # Return something rather than None when the sequence is missing
+            names.append(self._format_lot_name(abbreviation, today, next(numbers, 'ERROR')))
+        return names
+
+    @api.model
+    def _generate_name(self, product_id):
+        """Generate the lot name of a single product"""
+        return self._generate_names([product_id])[0]
+
+    @api.model
+    def _is_deferred(self):
+        """Whether forms show a preview name and the sequence number is only taken on create"""
+        return tools.str2bool(
+            self.env['ir.config_parameter'].sudo().get_param('custom_rsfp_module.deferred_lot_naming', 'False')
+        )
+
+    @api.model
+    def _generate_preview(self, product_id):
+        """Build a non-consuming preview of the lot name, e.g. DM-161025-####"""
+        abbreviation = self._get_product_lot_abbreviation(product_id) if product_id else None
+        if not abbreviation:
+            return False
+        placeholder = LOT_NAME_PREVIEW_CHAR * self._get_lot_number_padding()
+        return self._format_lot_name(abbreviation, fields.Date.today(), placeholder)
+
+    @api.model
+    def _is_preview(self, name):
+        """Check whether a lot name is a preview that still needs its sequence number"""
+        return bool(name) and LOT_NAME_PREVIEW_CHAR * self._get_lot_number_padding() in name
+
+    @api.model
+    def _get_form_name(self, product_id):
+        """Lot name proposed by forms: a preview in deferred mode, otherwise a real name"""
+        if self._is_deferred():
+            return self._generate_preview(product_id)
+        return self._generate_name(product_id)
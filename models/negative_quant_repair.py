@@ -0,0 +1,68 @@
+from odoo import models, fields, _ # type: ignore
+
+# This file defines the wizard running the global repair of negative lot quants in DS/PA locations (see stock.lot._repair_negative_lot_quants).
+# The same repair can run unattended with the "Lots: Repair Negative Lot Quants" scheduled action.
+
+# Maximum number of lot lines shown in the summary
+SUMMARY_MAX_LINES = 200
+
+class NegativeQuantRepairWizard(models.TransientModel):
+    _name = 'negative.quant.repair.wizard'
+    _description = 'Negative Lot Quant Repair Wizard'
+
+    dry_run = fields.Boolean(
+        string='Dry Run',
+        default=True,
+        help="Only report what would be fixed, without changing any inventory"
+    )
+
+    chunk_size = fields.Integer(
+        string='Lots per Chunk',
+        default=200,
+        required=True
+    )
+
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], default='draft')
+
+    lots_found = fields.Integer(string='Lots Found', readonly=True)
+    quants_found = fields.Integer(string='Negative Quants', readonly=True)
+    quantity_found = fields.Float(string='Negative Quantity', readonly=True)
+    lots_fixed = fields.Integer(string='Lots Fixed', readonly=True)
+    lots_unresolved = fields.Integer(string='Lots Skipped', readonly=True)
+    duration = fields.Float(string='Duration (s)', readonly=True)
+    rate = fields.Float(string='Lots per Second', readonly=True)
+    summary = fields.Text(string='Summary', readonly=True)
+
+    def action_run(self):
+        """Run the repair (or the dry run) and show its statistics"""
+        self.ensure_one()
+        stats = self.env['stock.lot']._repair_negative_lot_quants(
+            dry_run=self.dry_run, chunk_size=max(self.chunk_size, 1)
+        )
+
+        lines = stats['lines'][:SUMMARY_MAX_LINES]
+        if len(stats['lines']) > SUMMARY_MAX_LINES:
+            lines.append(_("... and %s more lots") % (len(stats['lines']) - SUMMARY_MAX_LINES))
+
+        self.write({
+            'state': 'done',
+            'lots_found': stats['lots'],
+            'quants_found': stats['quants'],
+            'quantity_found': stats['quantity'],
+            'lots_fixed': stats['fixed_lots'],
+            'lots_unresolved': stats['unresolved_lots'],
+            'duration': stats['duration'],
+            'rate': stats['rate'],
+            'summary': '\n'.join(lines) or _("No negative lot quants found in DS/PA locations."),
+        })
+
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
@@ -1,4 +1,4 @@
-from odoo import fields, models # type: ignore
+from odoo import fields, models, api # type: ignore
 
 # This file includes a new field called lot_abbreviation in the products.template field, to allow for a admin to assign a unique abreviation to the products in the inventory. 
 # This is being used for the custom lot sequence creation of the lot of the purchase order.  
@@ -17,4 +17,18 @@ class ProductTemplate(models.Model):
         ('lot_abbreviation_unique', 
          'UNIQUE (lot_abbreviation)',
          'The Product Abbreviation must be unique across all products!')
-    ]
\ No newline at end of file
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        templates = super(ProductTemplate, self).create(vals_list)
+        if any(vals.get('lot_abbreviation') for vals in vals_list):
+            # Invalidate the cached product -> abbreviation mapping of the lot naming engine
+            self.env.registry.clear_cache()
+        return templates
+
+    def write(self, vals):
+        if 'lot_abbreviation' in vals:
+            # Invalidate the cached product -> abbreviation mapping of the lot naming engine
+            self.env.registry.clear_cache()
+        return super(ProductTemplate, self).write(vals)
@@ -1,7 +1,4 @@
 from odoo import fields, models, api # type: ignore
-import logging
-
-_logger = logging.getLogger(__name__)
 
 class PurchaseOrder(models.Model):
     _inherit = 'purchase.order'
@@ -20,38 +17,41 @@ class PurchaseOrderLine(models.Model):
         'stock.lot',
         string='Assigned Parent Lot',
         compute='_compute_assigned_lot',
-        store=False,  # Changed to False to avoid storage issues
+        store=True,
         help="The parent lot assigned to this purchase order line during receipt"
     )
 
     lot_assigned = fields.Char(
         string='Lot Assigned',
         compute='_compute_lot_assigned',
+        store=True,
         help="Display name of the assigned parent lot"
     )
 
+    @api.depends('move_ids.state', 'move_ids.move_line_ids.lot_id')
     def _compute_assigned_lot(self):
-        """Compute the assigned lot from completed stock moves"""
+        """Compute the assigned lot from completed stock moves, for all lines in one grouped query"""
+        line_ids = [line_id for line_id in self._origin.ids if line_id]
+        lot_by_line = {}
+        if line_ids:
+            self.env['stock.move'].flush_model(['purchase_line_id'])
+            self.env['stock.move.line'].flush_model(['move_id', 'lot_id', 'state'])
+            self.env.cr.execute("""
+                SELECT move.purchase_line_id, MIN(move_line.lot_id)
+                  FROM stock_move_line move_line
+                  JOIN stock_move move ON move.id = move_line.move_id
+                 WHERE move.purchase_line_id IN %s
+                   AND move_line.state = 'done'
+                   AND move_line.lot_id IS NOT NULL
+                 GROUP BY move.purchase_line_id
+            """, (tuple(line_ids),))
+            lot_by_line = dict(self.env.cr.fetchall())
+        
         for line in self:
-            try:
-                # Search for stock move lines related to this purchase line
-                move_lines = self.env['stock.move.line'].search([
-                    ('picking_id.origin', '=', line.order_id.name),
-                    ('product_id', '=', line.product_id.id),
-                    ('state', '=', 'done'),
-                    ('lot_id', '!=', False)
-                ], limit=1)
-                
-                if move_lines:
-                    line.assigned_lot_id = move_lines.lot_id
-                else:
-                    line.assigned_lot_id = False
-                    
-            except Exception as e:
-                _logger.error(f"Error computing assigned lot for line {line.id}: {str(e)}")
-                line.assigned_lot_id = False
+            line.assigned_lot_id = lot_by_line.get(line._origin.id, False)
 
+    @api.depends('assigned_lot_id.name')
     def _compute_lot_assigned(self):
         """Compute the lot assigned field"""
         for line in self:
-            line.lot_assigned = line.assigned_lot_id.name if line.assigned_lot_id else ''
\ No newline at end of file
+            line.lot_assigned = line.assigned_lot_id.name if line.assigned_lot_id else ''
@@ -22,7 +22,7 @@ class CustomQualityReportImage(models.Model):
 class CustomQualityReport(models.Model):
     _name = 'custom.quality.report'
     _description = 'Quality Testing Report (Individual Child Lot)'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'custom.rsfp.report.attachment.mixin']
     _rec_name = 'name'
 
     # Header Details
@@ -178,29 +178,36 @@ class CustomQualityReport(models.Model):
 
     @api.depends('child_lot_id', 'child_lot_id.parent_lot_id')
     def _compute_sorting_report(self):
+        # Find the confirmed sorting reports of all parent lots in one search
+        parent_lots = self.child_lot_id.parent_lot_id
+        sorting_reports = {}
+        if parent_lots:
+            for sorting_report in self.env['custom.sorting.report'].search([
+                ('parent_lot_id', 'in', parent_lots.ids),
+                ('state', '=', 'confirmed')
+            ], order='id desc'):
+                # Descending order: the first report of each lot (as with limit=1) wins
+                sorting_reports[sorting_report.parent_lot_id.id] = sorting_report
+
         for record in self:
-            if record.child_lot_id and record.child_lot_id.parent_lot_id:
-                sorting_report = self.env['custom.sorting.report'].search([
-                    ('parent_lot_id', '=', record.child_lot_id.parent_lot_id.id),
-                    ('state', '=', 'confirmed')
-                ], limit=1)
-                record.sorting_report_id = sorting_report
-            else:
-                record.sorting_report_id = False
+            record.sorting_report_id = sorting_reports.get(record.child_lot_id.parent_lot_id.id, False)
 
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                # Use the new daily sequence
-                vals['name'] = self.env['ir.sequence'].next_by_code('custom.quality.report.daily') or _('New')
+        # Reserve the daily sequence numbers for the whole batch at once
+        unnamed_vals = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        names = self.env['ir.sequence'].next_by_code_batch('custom.quality.report.daily', len(unnamed_vals))
+        for vals, name in zip(unnamed_vals, names):
+            vals['name'] = name or _('New')
         return super().create(vals_list)
 
     def action_confirm(self):
-        """Confirm the quality report"""
+        """Confirm the quality reports, printing them as one PDF"""
         for record in self:
             record._validate_quality_data()
-            record.write({'state': 'confirmed'})
+
+        self.write({'state': 'confirmed'})
+        for record in self:
             record.message_post(
                 body=_("Quality Report confirmed by %s") % self.env.user.name
             )
@@ -221,8 +228,7 @@ class CustomQualityReport(models.Model):
             raise UserError(_("Test Location is required."))
 
     def _print_quality_report(self):
-        """Print quality report"""
-        self.ensure_one()
+        """Print quality report, as one PDF for all reports"""
         report = self.env.ref('custom_rsfp_module.action_report_quality_detail')
         return report.report_action(self)
 
@@ -230,4 +236,5 @@ class CustomQualityReport(models.Model):
         """Reset to draft state"""
         for record in self:
             record.write({'state': 'draft'})
-        return True
\ No newline at end of file
+        self._unlink_report_attachments()
+        return True
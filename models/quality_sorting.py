@@ -7,8 +7,9 @@ _logger = logging.getLogger(__name__)
 class CustomSortingReport(models.Model):
     _name = 'custom.sorting.report'
     _description = 'Product Sorting Report'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'custom.rsfp.job.mixin', 'custom.rsfp.report.attachment.mixin']
     _rec_name = 'name'
+    _background_report_xmlid = 'custom_rsfp_module.action_report_sorting_detail'
 
     # Header Details
     name = fields.Char(
@@ -146,41 +147,20 @@ class CustomSortingReport(models.Model):
     notes = fields.Text(string='Sorting Notes')
 
     # FIXED: Enhanced compute method for purchase_order_id
-    @api.depends('parent_lot_id')
+    @api.depends('parent_lot_id', 'parent_lot_id.receipt_purchase_order_id')
     def _compute_purchase_order(self):
-        """Compute purchase order from parent lot's stock moves"""
+        """Compute purchase order from parent lot's stored receipt provenance"""
         for record in self:
             if not record.parent_lot_id:
                 record.purchase_order_id = False
                 continue
             
-            _logger.info(f"Computing purchase order for lot: {record.parent_lot_id.name}")
-            
-            # Method 1: Find through stock move lines (most reliable)
-            move_lines = self.env['stock.move.line'].search([
-                ('lot_id', '=', record.parent_lot_id.id),
-                ('state', '=', 'done'),
-                ('move_id.purchase_line_id', '!=', False)
-            ], limit=1)
-            
-            if move_lines and move_lines.move_id.purchase_line_id:
-                record.purchase_order_id = move_lines.move_id.purchase_line_id.order_id
-                _logger.info(f"Found PO via move lines: {record.purchase_order_id.name}")
-                continue
-            
-            # Method 2: Find through stock moves directly
-            moves = self.env['stock.move'].search([
-                ('move_line_ids.lot_id', '=', record.parent_lot_id.id),
-                ('state', '=', 'done'),
-                ('purchase_line_id', '!=', False)
-            ], limit=1)
-            
-            if moves and moves.purchase_line_id:
-                record.purchase_order_id = moves.purchase_line_id.order_id
-                _logger.info(f"Found PO via moves: {record.purchase_order_id.name}")
+            # Method 1: Read the provenance captured when the receipt was validated
+            if record.parent_lot_id.receipt_purchase_order_id:
+                record.purchase_order_id = record.parent_lot_id.receipt_purchase_order_id
                 continue
             
-            # Method 3: Search by product and date (fallback)
+            # Method 2: Search by product and date (fallback for receipts without PO line link)
             recent_pos = self.env['purchase.order'].search([
                 ('order_line.product_id', '=', record.parent_lot_id.product_id.id),
                 ('state', 'in', ['purchase', 'done']),
@@ -197,7 +177,6 @@ class CustomSortingReport(models.Model):
                     break
             else:
                 record.purchase_order_id = False
-                _logger.info("No purchase order found for lot")
 
 
 
@@ -240,10 +219,11 @@ class CustomSortingReport(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                # Use the new daily sequence
-                vals['name'] = self.env['ir.sequence'].next_by_code('custom.sorting.report.daily') or _('New')
+        # Reserve the daily sequence numbers for the whole batch at once
+        unnamed_vals = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        names = self.env['ir.sequence'].next_by_code_batch('custom.sorting.report.daily', len(unnamed_vals))
+        for vals, name in zip(unnamed_vals, names):
+            vals['name'] = name or _('New')
         return super().create(vals_list)
 
     # FIXED: Temporarily disable constraint during module update
@@ -266,17 +246,34 @@ class CustomSortingReport(models.Model):
 
     def action_confirm(self):
         """Confirm the sorting report and create child lots"""
+        self._confirm_sorting()
+        return self._print_sorting_report()
+
+    def _validate_background_confirmation(self):
+        self._validate_sorting_data()
+
+    def _run_background_confirmation(self):
+        """Confirmation run by the background job, the PDF being rendered by the job itself"""
+        self.filtered(lambda record: record.state == 'draft')._confirm_sorting()
+
+    def _confirm_sorting(self):
+        """Create the child lots of the sorting reports and mark them confirmed.
+
+        Works on any number of reports; the locations and graded products they resolve are
+        cached, so a batch only looks them up once.
+        """
+        self._lock_parent_lots()
         for record in self:
             # IMPORTANT: Store the parent quantity BEFORE any processing
             record.parent_qty_at_sorting = record.parent_lot_id.product_qty
             record._validate_sorting_data()
             record._create_child_lots()
-            record.write({'state': 'confirmed'})
+
+        self.write({'state': 'confirmed'})
+        for record in self:
             record.message_post(
                 body=_("Sorting Report confirmed by %s") % self.env.user.name
             )
-        
-        return self._print_sorting_report()
 
     def _validate_sorting_data(self):
         """Validate sorting data before confirmation"""
@@ -310,9 +307,6 @@ class CustomSortingReport(models.Model):
         waste_location = self._get_or_create_waste_location()
         # stock_location = self.env.ref('stock.stock_location_stock')
 
-        # FIXED: Get the actual location where parent lot exists instead of hardcoded stock location
-        parent_stock_location = self._get_parent_lot_location()
-
         # NEW: Use sorting location for child lots (where sorting actually happens)
         sorting_location = self.sorting_location_id
 
@@ -327,43 +321,45 @@ class CustomSortingReport(models.Model):
             ('DC', self.qty_grade_dc, waste_location)       # Discarded items go to waste
         ]
 
-        # Rest of the method stays exactly the same
+        # Resolve the product of every grade first, then create all child lots in one batch
+        lot_vals_list = []
+        targets = []
         for grade_letter, qty, target_location in grades:
             if qty > 0:
-                child_lot_name = f"{parent_lot_name}-{grade_letter}"
-                
                 # Use existing method for A,B,C or new method for DC
                 if grade_letter == 'DC':
                     graded_product = self._get_discarded_product()
                 else:
                     graded_product = self._get_graded_product(grade_letter)
-                
-                # Create child lot with arrived_quantity context
-                child_lot = self.env['stock.lot'].with_context(
-                    arrived_quantity=qty
-                ).create({
-                    'name': child_lot_name,
+
+                if not graded_product:
+                    raise UserError(_("No product found for grade %s of %s.") % (grade_letter, self.product_id.display_name))
+
+                lot_vals_list.append({
+                    'name': f"{parent_lot_name}-{grade_letter}",
                     'product_id': graded_product.id,
                     'ref': parent_lot_name,
-                    'parent_lot_id': self.parent_lot_id.id
+                    'parent_lot_id': self.parent_lot_id.id,
+                    'arrived_quantity': qty,
                 })
+                targets.append((graded_product, target_location, qty))
 
-                # Update inventory  Only ADD inventory for child lots, don't reduce parent
-                self.env['stock.quant']._update_available_quantity(
-                    graded_product,
-                    target_location,
-                    qty,
-                    lot_id=child_lot
-                )
+        if lot_vals_list:
+            child_lots = self.env['stock.lot'].create(lot_vals_list)
 
-                self.env['stock.quant']._update_available_quantity(
-                    self.product_id,
-                    parent_stock_location,  # Use the actual parent location, not hardcoded stock location
-                    -qty,
-                    lot_id=self.parent_lot_id
-                )
+            # Update inventory: the child lots are new, so their quants are created directly in one pass
+            self.env['stock.quant']._create_new_lot_quants([
+                (graded_product, target_location, qty, child_lot)
+                for (graded_product, target_location, qty), child_lot in zip(targets, child_lots)
+            ])
+
+            # Reduce the parent lot once by the total sorted quantity, across all locations holding it
+            self.parent_lot_id._apply_drawdown(
+                sum(qty for _product, _location, qty in targets),
+                self.env['stock.location']._get_fallback_location()
+            )
 
-                created_lots.append(child_lot_name)
+            created_lots = child_lots.mapped('name')
 
         self.write({'inventory_processed': True})
         
@@ -374,38 +370,23 @@ class CustomSortingReport(models.Model):
 
         return True
     
-    def _get_parent_lot_location(self):
-        """Get the location where parent lot inventory actually exists"""
-        self.ensure_one()
-        
-        # Find where the parent lot has inventory
-        quants = self.env['stock.quant'].search([
-            ('lot_id', '=', self.parent_lot_id.id),
-            ('quantity', '>', 0)
-        ], limit=1)
-        
-        if quants:
-            _logger.info(f"Parent lot {self.parent_lot_id.name} found in location: {quants.location_id.name}")
-            return quants.location_id
-        else:
-            # Fallback to DS/Stock if it exists, otherwise stock location
-            ds_stock = self.env['stock.location'].search([
-                ('complete_name', 'ilike', 'DS/Stock'),
-                ('usage', '=', 'internal')
-            ], limit=1)
-            
-            if ds_stock:
-                _logger.info(f"Using DS/Stock as fallback location")
-                return ds_stock
-            else:
-                _logger.warning("No DS/Stock found, using default stock location")
-                return self.env.ref('stock.stock_location_stock')
-
     def _get_graded_product(self, grade_letter):
         """Get the graded product for a specific grade"""
         if not self.product_id:
             return False
-            
+
+        mapping_model = self.env['custom.grade.product.mapping']
+        graded_product = mapping_model._get_mapped_product(self.product_id, grade_letter)
+        if graded_product:
+            return graded_product
+
+        # Not mapped yet: fall back to the naming conventions and remember the result
+        graded_product = self._find_graded_product_by_name(grade_letter)
+        mapping_model._record_mapping(self.product_id, grade_letter, graded_product)
+        return graded_product
+
+    def _find_graded_product_by_name(self, grade_letter):
+        """Search the graded product of a grade by name (legacy lookup used for unmapped products)"""
         base_name = self.product_id.name.replace(' - Bulk', '').replace('Bulk', '')
         
         # Try different search patterns
@@ -441,10 +422,7 @@ class CustomSortingReport(models.Model):
 
     def _get_or_create_waste_location(self):
         """Get or create waste/discarded location"""
-        waste_location = self.env['stock.location'].search([
-            ('name', 'ilike', 'waste'),
-            ('usage', '=', 'internal')
-        ], limit=1)
+        waste_location = self.env['stock.location']._get_waste_location()
         
         if not waste_location:
             parent_location = self.env.ref('stock.stock_location_locations', raise_if_not_found=False)
@@ -464,7 +442,12 @@ class CustomSortingReport(models.Model):
         """Get or create the discarded product for the current bulk product"""
         if not self.product_id:
             return False
-            
+
+        mapping_model = self.env['custom.grade.product.mapping']
+        discarded_product = mapping_model._get_mapped_product(self.product_id, 'DC')
+        if discarded_product:
+            return discarded_product
+
         base_name = self.product_id.name.replace(' - Bulk', '').replace('Bulk', '').strip()
         discarded_name = f'{base_name} - Discarded'
         
@@ -486,12 +469,12 @@ class CustomSortingReport(models.Model):
                 # 'lot_abbreviation': self.product_id.lot_abbreviation or 'DC',
                 'active': True
             })
-        
+
+        mapping_model._record_mapping(self.product_id, 'DC', discarded_product)
         return discarded_product
 
     def _print_sorting_report(self):
-        """Print sorting report with child lot labels"""
-        self.ensure_one()
+        """Print sorting report with child lot labels, as one PDF for all reports"""
         report = self.env.ref('custom_rsfp_module.action_report_sorting_detail')
         return report.report_action(self)
 
@@ -499,6 +482,7 @@ class CustomSortingReport(models.Model):
         """Reset to draft state"""
         for record in self:
             record.write({'state': 'draft'})
+        self._unlink_report_attachments()
         return True
     
     def action_view_child_lot(self):
@@ -575,12 +559,7 @@ class CustomSortingReport(models.Model):
         _logger.info(f"Target location for transfers: {target_location.complete_name}")
         
         # NEW: Only search in DS and PA locations (company locations)
-        company_locations = self.env['stock.location'].search([
-            '|',
-            ('complete_name', '=like', 'DS/%'),    # Locations starting with DS/
-            ('complete_name', '=like', 'PA/%'),    # Locations starting with PA/
-            ('usage', '=', 'internal')
-        ])
+        company_locations = self.env['stock.location']._get_company_internal_locations()
         
         if not company_locations:
             message = "No DS or PA locations found. Cannot proceed with fix."
@@ -740,16 +719,10 @@ class CustomSortingReport(models.Model):
         
         _logger.info(f"Finding destination location for lot: {self.parent_lot_id.name}")
         
-        # Method 1: Find through stock move lines (most accurate)
-        move_lines = self.env['stock.move.line'].search([
-            ('lot_id', '=', self.parent_lot_id.id),
-            ('state', '=', 'done'),
-            ('move_id.purchase_line_id', '!=', False)
-        ], limit=1)
-        
-        if move_lines:
-            destination_location = move_lines.location_dest_id
-            _logger.info(f"Found destination via move lines: {destination_location.complete_name}")
+        # Method 1: Read the destination captured when the receipt was validated (most accurate)
+        if self.parent_lot_id.receipt_location_dest_id:
+            destination_location = self.parent_lot_id.receipt_location_dest_id
+            _logger.info(f"Found destination via receipt provenance: {destination_location.complete_name}")
             return destination_location
         
         # Method 2: Find through purchase order picking operations
@@ -0,0 +1,22 @@
+from odoo import models # type: ignore
+
+# This file holds the PDF caching shared by the sorting reports, quality reports and child lot creations.
+# Their report actions store the PDF of a confirmed record as an attachment named after the record; resetting
+# the record to draft removes it so the next print renders the document again.
+
+class CustomRsfpReportAttachmentMixin(models.AbstractModel):
+    _name = 'custom.rsfp.report.attachment.mixin'
+    _description = 'RSFP Report Attachment Mixin'
+
+    def _get_report_attachment_name(self):
+        """Name of the stored PDF, used by the report actions' attachment expression (False while not confirmed)"""
+        self.ensure_one()
+        return self.state == 'confirmed' and f"{self.name}.pdf"
+
+    def _unlink_report_attachments(self):
+        """Remove the PDFs stored when the records were confirmed, so the next print renders them again"""
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('name', 'in', [f"{record.name}.pdf" for record in self]),
+        ]).unlink()
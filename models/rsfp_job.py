@@ -0,0 +1,288 @@
+from odoo import models, fields, api, _ # type: ignore
+from odoo.exceptions import UserError # type: ignore
+import base64
+import logging
+import traceback
+
+# This file holds the background jobs used to confirm sorting reports and child lot creations outside of the HTTP request.
+# Jobs are stored in custom.rsfp.job and run by the "RSFP: Process Background Jobs" scheduled action, one committed
+# transaction per job. Jobs touching the same parent lot run one after the other, in creation order.
+
+_logger = logging.getLogger(__name__)
+
+# Advisory lock namespace serializing the jobs of one parent lot across workers
+JOB_LOCK_NAMESPACE = 0x52534650  # 'RSFP'
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+class CustomRsfpJob(models.Model):
+    _name = 'custom.rsfp.job'
+    _description = 'RSFP Background Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Description', required=True, readonly=True)
+
+    res_model = fields.Char(string='Model', required=True, readonly=True)
+    res_id = fields.Integer(string='Record ID', required=True, readonly=True)
+    method_name = fields.Char(string='Method', required=True, readonly=True)
+
+    parent_lot_id = fields.Many2one(
+        'stock.lot',
+        string='Parent Lot',
+        index=True,
+        readonly=True,
+        help="Jobs of the same parent lot never run concurrently"
+    )
+
+    user_id = fields.Many2one(
+        'res.users',
+        string='Requested By',
+        required=True,
+        readonly=True,
+        default=lambda self: self.env.user
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        readonly=True,
+        default=lambda self: self.env.company
+    )
+
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True, readonly=True, index=True)
+
+    attempts = fields.Integer(string='Attempts', default=0, readonly=True)
+    max_attempts = fields.Integer(string='Max Attempts', default=DEFAULT_MAX_ATTEMPTS, readonly=True)
+    error = fields.Text(string='Last Error', readonly=True)
+    date_done = fields.Datetime(string='Done On', readonly=True)
+
+    report_xmlid = fields.Char(string='Report', readonly=True)
+    attachment_id = fields.Many2one('ir.attachment', string='Document', readonly=True)
+
+    @api.model
+    def _enqueue(self, records, method_name, report_xmlid=None):
+        """Create one pending job per record and wake up the job runner"""
+        jobs = self.sudo().create([{
+            'name': _("%s: %s") % (record._description, record.display_name),
+            'res_model': record._name,
+            'res_id': record.id,
+            'method_name': method_name,
+            'parent_lot_id': record.parent_lot_id.id,
+            'report_xmlid': report_xmlid,
+        } for record in records])
+        self.env.ref('custom_rsfp_module.ir_cron_process_rsfp_jobs')._trigger()
+        return jobs
+
+    @api.model
+    def _cron_process_jobs(self, limit=50):
+        """Run pending jobs one by one, committing after each of them"""
+        processed = 0
+        attempted_ids = []
+        while processed < limit:
+            # Failed jobs waiting for a retry are left for the next run
+            job = self._acquire_next_job(attempted_ids)
+            if not job:
+                break
+            attempted_ids.append(job.id)
+            job._run()
+            self.env.cr.commit()
+            processed += 1
+
+        if processed >= limit:
+            # More jobs may be waiting, run again as soon as possible
+            self.env.ref('custom_rsfp_module.ir_cron_process_rsfp_jobs')._trigger()
+        return processed
+
+    @api.model
+    def _acquire_next_job(self, exclude_ids=()):
+        """Lock and return the oldest runnable job (empty recordset if none).
+
+        A job is runnable when no older pending or running job exists for its parent lot and
+        no other worker holds its parent lot's advisory lock. Rows locked by other workers are
+        skipped, so several job runners can work in parallel on different lots.
+        """
+        self.env.cr.execute("""
+            SELECT job.id, job.parent_lot_id
+              FROM custom_rsfp_job job
+             WHERE job.state = 'pending'
+               AND NOT EXISTS (
+                    SELECT 1 FROM custom_rsfp_job prior
+                     WHERE prior.parent_lot_id = job.parent_lot_id
+                       AND prior.state IN ('pending', 'running')
+                       AND prior.id < job.id
+               )
+             ORDER BY job.id
+        """)
+        for job_id, parent_lot_id in self.env.cr.fetchall():
+            if job_id in exclude_ids:
+                continue
+            self.env.cr.execute("""
+                SELECT id FROM custom_rsfp_job
+                 WHERE id = %s AND state = 'pending'
+                   FOR UPDATE SKIP LOCKED
+            """, (job_id,))
+            if not self.env.cr.fetchone():
+                continue
+            if parent_lot_id:
+                self.env.cr.execute(
+                    "SELECT pg_try_advisory_xact_lock(%s, %s)", (JOB_LOCK_NAMESPACE, parent_lot_id)
+                )
+                if not self.env.cr.fetchone()[0]:
+                    continue
+            return self.browse(job_id)
+        return self.browse()
+
+    def _run(self):
+        """Run the job as its requester, render its document and notify the requester"""
+        self.ensure_one()
+        self.write({'state': 'running', 'attempts': self.attempts + 1})
+        record = self.env[self.res_model].with_user(self.user_id).with_company(self.company_id).browse(self.res_id)
+        try:
+            with self.env.cr.savepoint():
+                if not record.exists():
+                    raise UserError(_("The record of this job no longer exists."))
+                if not self.method_name.startswith('_run_'):
+                    raise UserError(_("Method %s cannot be run as a background job.") % self.method_name)
+                getattr(record, self.method_name)()
+                attachment = self._render_document(record)
+        except Exception as e:
+            self.env.invalidate_all()
+            _logger.warning(f"Background job {self.id} ({self.name}) failed on attempt {self.attempts}: {e}")
+            retry = self.attempts < self.max_attempts
+            self.write({
+                'state': 'pending' if retry else 'failed',
+                'error': traceback.format_exc(),
+            })
+            if not retry:
+                self._notify(_("%s failed: %s") % (self.name, e), 'danger')
+            return False
+
+        self.write({
+            'state': 'done',
+            'error': False,
+            'date_done': fields.Datetime.now(),
+            'attachment_id': attachment.id,
+        })
+        self._notify(_("%s is done.") % self.name, 'success')
+        return True
+
+    def _render_document(self, record):
+        """Render the job's report for the record and attach it to the record's chatter"""
+        if not self.report_xmlid:
+            return self.env['ir.attachment']
+        report = self.env['ir.actions.report'].with_user(self.user_id)._get_report(self.report_xmlid)
+        pdf_content, _report_type = report._render_qweb_pdf(report, record.ids)
+
+        # Reports caching their PDF as an attachment have just stored it
+        attachment = report.retrieve_attachment(record)
+        if attachment:
+            record.message_post(body=_("Document generated in background."), attachment_ids=attachment.ids)
+            return attachment
+
+        attachment = self.env['ir.attachment'].sudo().create({
+            'name': f"{record.display_name}.pdf",
+            'type': 'binary',
+            'datas': base64.b64encode(pdf_content),
+            'res_model': record._name,
+            'res_id': record.id,
+            'mimetype': 'application/pdf',
+        })
+        record.message_post(body=_("Document generated in background."), attachment_ids=attachment.ids)
+        return attachment
+
+    def _notify(self, message, notification_type):
+        """Send a notification to the job's requester through the bus"""
+        self.env['bus.bus']._sendone(self.user_id.partner_id, 'simple_notification', {
+            'title': _("Background Job"),
+            'message': message,
+            'type': notification_type,
+            'sticky': notification_type == 'danger',
+        })
+
+    def action_retry(self):
+        """Put failed jobs back in the queue"""
+        self.filtered(lambda job: job.state == 'failed').write({'state': 'pending', 'attempts': 0})
+        self.env.ref('custom_rsfp_module.ir_cron_process_rsfp_jobs')._trigger()
+        return True
+
+    def action_open_record(self):
+        """Open the record the job works on"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self.res_model,
+            'res_id': self.res_id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+
+class CustomRsfpJobMixin(models.AbstractModel):
+    """Background confirmation for documents working on a parent lot (sorting reports, child lot creations)"""
+    _name = 'custom.rsfp.job.mixin'
+    _description = 'RSFP Background Confirmation Mixin'
+
+    # XML id of the report rendered once the background confirmation is done
+    _background_report_xmlid = None
+
+    background_job_id = fields.Many2one(
+        'custom.rsfp.job',
+        string='Background Job',
+        readonly=True,
+        copy=False
+    )
+
+    background_job_state = fields.Selection(
+        related='background_job_id.state',
+        string='Background Job Status'
+    )
+
+    def _validate_background_confirmation(self):
+        """Check a record can be confirmed, before queueing it; overridden by each document"""
+        return True
+
+    def _run_background_confirmation(self):
+        """Confirmation work done by the background job; overridden by each document (nothing to do by default)"""
+        return True
+
+    def _lock_parent_lots(self):
+        """Wait for the advisory locks of the records' parent lots, the same locks the job runner takes.
+
+        Synchronous and background confirmations of one parent lot are thus serialized. Locks are
+        taken in id order to avoid deadlocks and released at the end of the transaction; the parent
+        quantities are read again once they are held.
+        """
+        parent_lots = self.parent_lot_id
+        for parent_lot_id in sorted(parent_lots.ids):
+            self.env.cr.execute("SELECT pg_advisory_xact_lock(%s, %s)", (JOB_LOCK_NAMESPACE, parent_lot_id))
+        parent_lots.invalidate_recordset(['product_qty'])
+
+    def action_confirm_background(self):
+        """Queue the confirmation of the records and return immediately"""
+        for record in self:
+            if record.state != 'draft':
+                raise UserError(_("%s is not in draft.") % record.display_name)
+            if record.background_job_state in ('pending', 'running'):
+                raise UserError(_("%s is already being confirmed in background.") % record.display_name)
+            record._validate_background_confirmation()
+
+        jobs = self.env['custom.rsfp.job']._enqueue(self, '_run_background_confirmation', self._background_report_xmlid)
+        for record, job in zip(self, jobs):
+            record.background_job_id = job
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Confirmation Queued'),
+                'message': _("%s record(s) will be confirmed in background. You will be notified when done.") % len(self),
+                'type': 'info',
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            }
+        }
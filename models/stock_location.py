@@ -0,0 +1,87 @@
+from odoo import models, api, tools # type: ignore
+
+# This file caches the locations resolved by sorting and child lot creation (waste location, DS/Stock and stock fallbacks,
+# DS/PA internal locations) per company and worker. Any change to the location tree clears the registry cache of every worker.
+
+# Location fields whose change can alter a cached resolution
+LOCATION_CACHE_FIELDS = {'name', 'location_id', 'usage', 'active', 'company_id'}
+
+def _company_domain(company_id):
+    return [('company_id', 'in', [company_id, False])]
+
+class StockLocation(models.Model):
+    _inherit = 'stock.location'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        locations = super(StockLocation, self).create(vals_list)
+        self.env.registry.clear_cache()
+        return locations
+
+    def write(self, vals):
+        if LOCATION_CACHE_FIELDS.intersection(vals):
+            self.env.registry.clear_cache()
+        return super(StockLocation, self).write(vals)
+
+    def unlink(self):
+        self.env.registry.clear_cache()
+        return super(StockLocation, self).unlink()
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_cached_waste_location_id(self, company_id):
+        """Return the id of the company's internal waste location (None if there is none)"""
+        location = self.sudo().search([
+            ('name', 'ilike', 'waste'),
+            ('usage', '=', 'internal')
+        ] + _company_domain(company_id), limit=1)
+        return location.id or None
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_cached_fallback_location_id(self, company_id):
+        """Return the id of the company's DS/Stock location, or of the default stock location"""
+        location = self.sudo().search([
+            ('complete_name', 'ilike', 'DS/Stock'),
+            ('usage', '=', 'internal')
+        ] + _company_domain(company_id), limit=1)
+        return location.id or self._get_cached_default_stock_location_id()
+
+    @api.model
+    @tools.ormcache()
+    def _get_cached_default_stock_location_id(self):
+        """Return the id of stock.stock_location_stock (None if it was removed)"""
+        location = self.env.ref('stock.stock_location_stock', raise_if_not_found=False)
+        return location.id if location else None
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_cached_company_location_ids(self, company_id):
+        """Return the ids of the company's internal locations under DS/ and PA/"""
+        locations = self.sudo().search([
+            '|',
+            ('complete_name', '=like', 'DS/%'),
+            ('complete_name', '=like', 'PA/%'),
+            ('usage', '=', 'internal')
+        ] + _company_domain(company_id))
+        return tuple(locations.ids)
+
+    @api.model
+    def _get_waste_location(self):
+        """Internal waste location of the current company (empty recordset if there is none)"""
+        return self.browse(self._get_cached_waste_location_id(self.env.company.id))
+
+    @api.model
+    def _get_fallback_location(self):
+        """Location used when a lot has no positive inventory: DS/Stock, else the default stock location"""
+        return self.browse(self._get_cached_fallback_location_id(self.env.company.id))
+
+    @api.model
+    def _get_default_stock_location(self):
+        """The default stock location (stock.stock_location_stock)"""
+        return self.browse(self._get_cached_default_stock_location_id())
+
+    @api.model
+    def _get_company_internal_locations(self):
+        """Internal DS/ and PA/ locations of the current company"""
+        return self.browse(self._get_cached_company_location_ids(self.env.company.id))
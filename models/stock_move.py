@@ -0,0 +1,16 @@
+from odoo import models # type: ignore
+
+# This file captures the receipt provenance (PO, vendor, received date, destination) of lots when a purchase receipt is validated
+# and writes the arrived quantities of the lots received by the moves
+
+class StockMove(models.Model):
+    _inherit = 'stock.move'
+
+    def _action_done(self, cancel_backorder=False):
+        moves = super(StockMove, self)._action_done(cancel_backorder=cancel_backorder)
+        # Write the arrived quantities buffered while the quants were updated
+        self.env['stock.quant']._flush_lot_first_arrivals()
+        receipt_moves = moves.filtered(lambda move: move.state == 'done' and move.purchase_line_id)
+        if receipt_moves:
+            self.env['stock.lot']._capture_receipt_provenance(receipt_moves.move_line_ids)
+        return moves
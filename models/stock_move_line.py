@@ -1,139 +1,165 @@
-from odoo import fields, models, api # type: ignore
+from odoo import models, api # type: ignore
 import logging
+from .tracing import get_tracer
 
 # This file is used to ensure that the custom sequence is generated by default if the new lot is created, irrespective of the interface used 
 
 _logger = logging.getLogger(__name__)
 
+# Fields whose update can leave a move line without its lot_name
+LOT_NAME_TRIGGER_FIELDS = {'lot_name', 'product_id', 'qty_done'}
+
 class StockMoveLine(models.Model):
     _inherit = 'stock.move.line'
 
     @api.model
     def default_get(self, fields_list):
         """Override to provide default lot when creating move lines"""
-        _logger.info("=== STOCK MOVE LINE DEFAULT_GET CALLED ===")
-        _logger.info(f"Context: {self._context}")
+        trace = get_tracer(self.env, 'stock.move.line')
+        trace("=== STOCK MOVE LINE DEFAULT_GET CALLED ===")
+        trace("Context: %s", self._context)
         
         res = super(StockMoveLine, self).default_get(fields_list)
-        _logger.info(f"Super result: {res}")
+        trace("Super result: %s", res)
         
         # Check if we should generate a lot name
         if 'lot_name' in fields_list:
             product_id = self._context.get('default_product_id') or res.get('product_id')
-            _logger.info(f"Product ID: {product_id}")
+            trace("Product ID: %s", product_id)
             
             if product_id:
                 product = self.env['product.product'].browse(product_id)
-                _logger.info(f"Product: {product.name}, Tracking: {product.tracking}")
+                if trace:
+                    trace("Product: %s, Tracking: %s", product.display_name, product.tracking)
                 
                 # Only generate for products with lot/serial tracking
                 if product.tracking in ['lot', 'serial']:
-                    custom_lot_name = self._generate_lot_name_for_product(product_id)
-                    _logger.info(f"Generated lot name: {custom_lot_name}")
+                    custom_lot_name = self.env['stock.lot']._get_form_lot_name(product_id)
+                    trace("Generated lot name: %s", custom_lot_name)
                     
                     if custom_lot_name:
                         res['lot_name'] = custom_lot_name
-                        _logger.info(f"Set lot_name to: {custom_lot_name}")
         
-        _logger.info(f"Final result: {res}")
+        trace("Final result: %s", res)
         return res
     
 
     def write(self, vals):
         """Override write to set lot_name for existing records and handle arrived_quantity"""
-        # Handle arrived_quantity before the main write operation
-        if 'qty_done' in vals:
-            for record in self:
-                if (record.lot_id and vals.get('qty_done', 0) > 0 and 
-                    record.location_dest_id.usage == 'internal'):
-                    # This is a receipt - set arrived_quantity if needed
-                    try:
-                        record.lot_id._set_arrived_quantity_if_needed(vals['qty_done'])
-                    except Exception as e:
-                        _logger.warning(f"Failed to set arrived_quantity for lot {record.lot_id.name}: {e}")
+        # Handle arrived_quantity before the main write operation, with one grouped update of the lots
+        if vals.get('qty_done', 0) > 0:
+            receipt_lines = self.filtered(lambda ml: ml.lot_id and ml.location_dest_id.usage == 'internal')
+            lots = receipt_lines.lot_id.filtered(lambda lot: not lot.arrived_quantity)
+            if lots:
+                # This is a receipt - set arrived_quantity on the lots that don't have one yet
+                try:
+                    lots.sudo().write({'arrived_quantity': vals['qty_done']})
+                except Exception as e:
+                    _logger.warning(f"Failed to set arrived_quantity for lots {', '.join(lots.mapped('name'))}: {e}")
         
+        # Lot name previews coming from forms get their real sequence number on save
+        name_all_lines = bool(vals.get('lot_name')) and self.env['stock.lot']._is_lot_name_preview(vals['lot_name'])
+        if name_all_lines:
+            vals = dict(vals, lot_name=False)
+
         result = super(StockMoveLine, self).write(vals)
         
-        # Original logic for lot_name generation
-        for record in self:
-            # Check if this is an existing record without lot_name but with product_id
-            if (not record.lot_name and 
-                record.product_id and 
-                record.product_id.tracking in ['lot', 'serial'] and 
-                record.qty_done == 0 and  # Not yet processed
-                not vals.get('lot_name')):  # Not setting lot_name in this write
-                
-                _logger.info(f"Auto-generating lot_name for existing record: {record.id}")
-                custom_lot_name = self._generate_lot_name_for_product(record.product_id.id)
-                if custom_lot_name:
-                    record.lot_name = custom_lot_name
-                    _logger.info(f"Auto-set lot_name to: {custom_lot_name}")
+        # Only back-fill lot_name when this write can leave a line without one
+        if vals.get('lot_name') or not (name_all_lines or LOT_NAME_TRIGGER_FIELDS.intersection(vals)):
+            return result
+        
+        if name_all_lines:
+            lines_to_name = self
+        else:
+            # Existing records without lot_name, with a tracked product and not yet processed
+            lines_to_name = self.filtered(lambda ml: (
+                not ml.lot_name and
+                ml.product_id.tracking in ['lot', 'serial'] and
+                ml.qty_done == 0
+            ))
+        
+        if lines_to_name:
+            names = self.env['custom.lot.naming']._generate_names([line.product_id.id for line in lines_to_name])
+            lines_to_name._set_lot_names(names)
+            get_tracer(self.env, 'stock.move.line')("Auto-set lot_name of records %s", lines_to_name.ids)
         
         return result
 
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         """Override create to ensure lot_name is set for new records"""
-        _logger.info("=== STOCK MOVE LINE CREATE CALLED ===")
-        _logger.info(f"Values: {vals}")
+        trace = get_tracer(self.env, 'stock.move.line')
+        trace("=== STOCK MOVE LINE CREATE CALLED ===")
+        trace("Values: %s", vals_list)
         
-        # If lot_name not provided but product_id is available
-        if (not vals.get('lot_name') and 
-            vals.get('product_id')):
-            
-            product = self.env['product.product'].browse(vals['product_id'])
-            if product.tracking in ['lot', 'serial']:
-                custom_lot_name = self._generate_lot_name_for_product(vals['product_id'])
+        lot_naming = self.env['custom.lot.naming']
+        for vals in vals_list:
+            # Lot name previews coming from forms get their real sequence number now
+            if lot_naming._is_preview(vals.get('lot_name')):
+                vals['lot_name'] = False
+        
+        # Lines without lot_name but with a product_id, grouped by product
+        vals_by_product = {}
+        for vals in vals_list:
+            if not vals.get('lot_name') and vals.get('product_id'):
+                vals_by_product.setdefault(vals['product_id'], []).append(vals)
+        
+        if vals_by_product:
+            # Read the tracking of all products at once, then name every tracked line in one reservation
+            products = self.env['product.product'].browse(list(vals_by_product))
+            tracked_products = products.filtered(lambda product: product.tracking in ['lot', 'serial'])
+            vals_to_name = [vals for product in tracked_products for vals in vals_by_product[product.id]]
+            names = lot_naming._generate_names([vals['product_id'] for vals in vals_to_name])
+            for vals, custom_lot_name in zip(vals_to_name, names):
                 if custom_lot_name:
                     vals['lot_name'] = custom_lot_name
-                    _logger.info(f"Set lot_name in create: {custom_lot_name}")
+            trace("Set lot_name in create for %s lines", len(vals_to_name))
         
-        return super(StockMoveLine, self).create(vals)
+        return super(StockMoveLine, self).create(vals_list)
 
+    def _set_lot_names(self, names):
+        """Store one generated lot name per line (empty names are skipped) with a single UPDATE.
+
+        Dependent fields are then recomputed once for all the lines instead of line by line.
+        """
+        named = [(line.id, name) for line, name in zip(self, names) if name]
+        if not named:
+            return
+        lines = self.browse([line_id for line_id, _name in named])
+        lines.flush_recordset(['lot_name'])
+        self.env.cr.execute("""
+            UPDATE stock_move_line line
+               SET lot_name = named.lot_name,
+                   write_uid = %s,
+                   write_date = (now() at time zone 'UTC')
+              FROM unnest(%s::int[], %s::varchar[]) AS named(id, lot_name)
+             WHERE line.id = named.id
+        """, (self.env.uid, [line_id for line_id, _name in named], [name for _line_id, name in named]))
+        lines.invalidate_recordset(['lot_name', 'write_uid', 'write_date'])
+        lines.modified(['lot_name'])
 
     @api.model
     def _generate_lot_name_for_product(self, product_id):
         """Generate lot name using the same logic as stock.lot"""
-        _logger.info(f"=== Generating lot name for product: {product_id} ===")
-        
-        if not product_id:
-            return False
-            
-        product = self.env['product.product'].browse(product_id)
-        if not product.exists():
-            return False
-        
-        abbreviation = product.product_tmpl_id.lot_abbreviation or 'XX'
-        today = fields.Date.today()
-        date_str = today.strftime('%d%m%y')
-        
-        # Get the next sequence number
-        sequence_code = 'parent.lot.daily.sequence'
-        seq_number = self.env['ir.sequence'].next_by_code(sequence_code)
-        
-        if not seq_number:
-            _logger.error("Sequence not found!")
-            return f"{abbreviation}-{date_str}-ERROR"
-        
-        lot_name = f"{abbreviation}-{date_str}-{seq_number}"
-        _logger.info(f"Generated lot name: {lot_name}")
-        return lot_name
+        return self.env['custom.lot.naming']._generate_name(product_id)
 
     @api.onchange('product_id')
     def _onchange_product_id_lot_name(self):
         """Generate lot name when product changes"""
-        _logger.info(f"=== MOVE LINE ONCHANGE product_id ===")
-        _logger.info(f"Product: {self.product_id.name if self.product_id else 'None'}")
-        _logger.info(f"Current lot_name: {self.lot_name}")
+        trace = get_tracer(self.env, 'stock.move.line')
+        trace("=== MOVE LINE ONCHANGE product_id ===")
+        if trace:
+            trace("Product: %s", self.product_id.display_name)
+            trace("Current lot_name: %s", self.lot_name)
         
         if self.product_id and self.product_id.tracking in ['lot', 'serial']:
             # Only set if lot_name is empty or looks like a default value
-            if not self.lot_name or self.lot_name.startswith('SN'):
-                generated_name = self._generate_lot_name_for_product(self.product_id.id)
-                _logger.info(f"Generated name via onchange: {generated_name}")
+            if (not self.lot_name or self.lot_name.startswith('SN') or
+                    self.env['stock.lot']._is_lot_name_preview(self.lot_name)):
+                generated_name = self.env['stock.lot']._get_form_lot_name(self.product_id.id)
+                trace("Generated name via onchange: %s", generated_name)
                 if generated_name:
                     self.lot_name = generated_name
-                    _logger.info(f"Set lot_name to: {self.lot_name}")
 
 
     # NEW: Method to fix existing records without lot_name
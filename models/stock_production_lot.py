@@ -1,6 +1,8 @@
 from odoo import fields, models, api # type: ignore
 from odoo.exceptions import UserError # type: ignore
 import logging
+import time
+from .tracing import get_tracer
 
 # This file is used to create a default customized lot/sequence name whenever the lot is created in the lot/sequence menu in the inventory tab
 # This file complements the stock_move_line.py file
@@ -8,18 +10,32 @@ import logging
 
 _logger = logging.getLogger(__name__)
 
+# Resumable arrived_quantity migration: chunk size, checkpoint parameter and time budget of one cron run
+MIGRATION_CHUNK_SIZE = 5000
+MIGRATION_CHECKPOINT_PARAM = 'custom_rsfp_module.arrived_quantity_migration_checkpoint'
+MIGRATION_CRON_TIME_LIMIT = 240
+
+# Number of lots repaired per chunk (and commit, when run by the cron) by the negative quant repair
+REPAIR_CHUNK_SIZE = 200
+
 class StockLot(models.Model):
     _inherit = 'stock.lot'
     _description = 'Stock Lot Extension'
+    _parent_name = 'parent_lot_id'
+    _parent_store = True
 
     # Make the ref field clickable and add parent lot reference
     parent_lot_id = fields.Many2one(
         'stock.lot',
         string='Parent Lot',
         readonly=True,
+        index=True,
         help="The parent lot from which this child lot was created during quality grading"
     )
 
+    # Materialized lot genealogy (e.g. "12/57/93/"), maintained by the ORM from parent_lot_id
+    parent_path = fields.Char(index=True, unaccent=False)
+
     # Arrived quantity field - captures initial quantity when lot was created
     arrived_quantity = fields.Float(
         string='Arrived Quantity',
@@ -29,75 +45,124 @@ class StockLot(models.Model):
         copy=False
     )
 
-    @api.model
-    def create(self, vals):
-        """Override create to inject custom lot name and set initial arrived_quantity"""
-        _logger.info("=== LOT CREATE METHOD CALLED ===")
-        _logger.info(f"Values: {vals}")
-        _logger.info(f"Context: {self._context}")
+    # Receipt provenance - captured once when the purchase receipt of the lot is validated
+    receipt_purchase_line_id = fields.Many2one(
+        'purchase.order.line',
+        string='Receipt PO Line',
+        readonly=True,
+        index=True,
+        copy=False,
+        help="Purchase order line through which this lot was received"
+    )
+
+    receipt_purchase_order_id = fields.Many2one(
+        'purchase.order',
+        string='Receipt Purchase Order',
+        readonly=True,
+        index=True,
+        copy=False
+    )
+
+    receipt_partner_id = fields.Many2one(
+        'res.partner',
+        string='Vendor',
+        readonly=True,
+        index=True,
+        copy=False
+    )
+
+    receipt_date = fields.Datetime(
+        string='Received Date',
+        readonly=True,
+        index=True,
+        copy=False
+    )
+
+    receipt_location_dest_id = fields.Many2one(
+        'stock.location',
+        string='Receipt Destination',
+        readonly=True,
+        index=True,
+        copy=False,
+        help="Location where the lot was put when it was received"
+    )
+
+    # Next number handed out to a child lot split from this lot (0 until first used)
+    next_child_index = fields.Integer(
+        string='Next Child Index',
+        default=0,
+        readonly=True,
+        copy=False,
+        help="Sequential number the next child lot created from this lot will get"
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Override create to inject custom lot names and set initial arrived_quantity"""
+        trace = get_tracer(self.env, 'stock.lot')
+        trace("=== LOT CREATE METHOD CALLED ===")
+        trace("Values: %s", vals_list)
+        trace("Context: %s", self._context)
         
-        # Check if name is not provided or is a placeholder/default value
-        should_generate = (
-            not vals.get('name') or 
-            vals.get('name', '').isdigit() or
-            vals.get('name', '').startswith('LOT/') or
-            vals.get('name', '') == ''
-        )
+        # Collect the lots whose name is missing or a placeholder/default value
+        default_product_id = self._context.get('default_product_id') or self._context.get('product_id')
+        vals_to_name = []
+        for vals in vals_list:
+            product_id = vals.get('product_id') or default_product_id
+            if product_id and self._should_generate_lot_name(vals.get('name')):
+                vals_to_name.append((vals, product_id))
         
-        _logger.info(f"Should generate custom name: {should_generate}")
+        trace("Lots needing a custom name: %s", len(vals_to_name))
         
-        if should_generate:
-            # Try to get product_id from vals or context
-            product_id = vals.get('product_id') or self._context.get('default_product_id') or self._context.get('product_id')
-            _logger.info(f"Product ID: {product_id}")
-            
-            if product_id:
-                custom_name = self._generate_lot_name(product_id)
-                _logger.info(f"Generated custom name: {custom_name}")
+        # Name the whole batch with a single sequence reservation
+        if vals_to_name:
+            names = self.env['custom.lot.naming']._generate_names([product_id for _vals, product_id in vals_to_name])
+            for (vals, _product_id), custom_name in zip(vals_to_name, names):
                 if custom_name:
                     vals['name'] = custom_name
-                    _logger.info(f"Name set to: {vals['name']}")
         
-        _logger.info(f"Final vals before super: {vals}")
-                
-        # Create the lot first
-        lot = super(StockLot, self).create(vals)
-
-        # Ensure we have a valid lot record
-        if not lot:
-            _logger.error("Super create returned None - this should not happen!")
-            raise ValueError("Failed to create lot record")
+        # Set initial arrived_quantity in the INSERT instead of a follow-up write
+        initial_qty = self._get_initial_quantity_for_lot()
+        if initial_qty > 0:
+            for vals in vals_list:
+                if not vals.get('arrived_quantity'):
+                    vals['arrived_quantity'] = initial_qty
         
-        # Set initial arrived_quantity based on context or initial quantity
-        try:
-            initial_qty = self._get_initial_quantity_for_lot(lot, vals)
-            if initial_qty > 0 and not lot.arrived_quantity:
-                lot.sudo().write({'arrived_quantity': initial_qty})
-                _logger.info(f"Set arrived_quantity to {initial_qty} for lot {lot.name}")
-        except Exception as e:
-            _logger.warning(f"Could not set arrived_quantity for lot {lot.name}: {e}")
-        
-        # ALWAYS return the lot record
-        return lot
+        trace("Final vals before super: %s", vals_list)
+        return super(StockLot, self).create(vals_list)
+
+    def unlink(self):
+        """Detach the child lots through the ORM first, so their parent_path is recomputed.
+
+        The database would also null parent_lot_id (ON DELETE SET NULL) but leave the
+        children's parent_path pointing at the deleted lot.
+        """
+        children = self.search([('parent_lot_id', 'in', self.ids), ('id', 'not in', self.ids)])
+        if children:
+            children.write({'parent_lot_id': False})
+        return super(StockLot, self).unlink()
     
-    def _get_initial_quantity_for_lot(self, lot, vals):
-        """Determine the initial quantity for a newly created lot"""
-        _logger.info(f"=== Getting initial quantity for lot: {lot.name} ===")
-        
-        # 1. Check if quantity specified in context (for child lots)
+    @api.model
+    def _should_generate_lot_name(self, name):
+        """Check if a lot name is missing or a placeholder/default value to be replaced"""
+        return (
+            not name or
+            name.isdigit() or
+            name.startswith('LOT/') or
+            self._is_lot_name_preview(name)
+        )
+    
+    @api.model
+    def _get_initial_quantity_for_lot(self):
+        """Determine the initial quantity for newly created lots.
+
+        Only the context can provide it (for child lots): a lot being created has no stock
+        yet, so for manual creation this returns 0 and the quantity is set when the first
+        stock move is processed.
+        """
         context_qty = self._context.get('arrived_quantity') or self._context.get('initial_quantity')
         if context_qty and context_qty > 0:
-            _logger.info(f"Found quantity in context: {context_qty}")
             return context_qty
-        
-        # 2. Check current product_qty (for immediate stock creation scenarios)
-        if lot.product_qty > 0:
-            _logger.info(f"Using current product_qty: {lot.product_qty}")
-            return lot.product_qty
-        
-        # For manual creation without immediate stock, return 0
-        # The quantity will be set when the first stock move is processed
-        _logger.info("No initial quantity found, will be set on first stock move")
         return 0.0
     
     def _set_arrived_quantity_if_needed(self, quantity):
@@ -106,50 +171,347 @@ class StockLot(models.Model):
         if not self.arrived_quantity and quantity > 0:
             # Use sudo to ensure we can write even if the field is readonly
             self.sudo().write({'arrived_quantity': quantity})
-            _logger.info(f"Auto-set arrived_quantity to {quantity} for lot {self.name}")
+            get_tracer(self.env, 'stock.lot')("Auto-set arrived_quantity to %s for lot %s", quantity, self.name)
             return True
         elif self.arrived_quantity:
             _logger.debug(f"Lot {self.name} already has arrived_quantity set to {self.arrived_quantity}")
         return False
     
     @api.model
-    def _migrate_existing_lots_arrived_quantity(self):
-        """Migration method to set arrived_quantity for existing lots"""
+    def _migrate_existing_lots_arrived_quantity(self, chunk_size=MIGRATION_CHUNK_SIZE, commit=False, time_limit=None):
+        """Migration method to set arrived_quantity for existing lots.
+
+        Lots are processed by id in chunks; each chunk aggregates the on-hand quantity of
+        its lots from stock.quant and updates them in a single SQL statement. The last
+        processed id is kept in a checkpoint parameter, so with ``commit=True`` an
+        interrupted run resumes where it stopped. Returns progress statistics.
+        """
         _logger.info("=== MIGRATING EXISTING LOTS ===")
+        params = self.env['ir.config_parameter'].sudo()
+        last_id = int(params.get_param(MIGRATION_CHECKPOINT_PARAM, 0) or 0)
         
-        # Find all lots without arrived_quantity
-        lots_without_arrived_qty = self.search([
-            ('arrived_quantity', '=', 0),
-            ('product_qty', '>', 0)
-        ])
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT COUNT(*) FROM stock_lot WHERE id > %s AND COALESCE(arrived_quantity, 0) = 0
+        """, (last_id,))
+        total = self.env.cr.fetchone()[0]
+        _logger.info(f"Found {total} lots without arrived_quantity after checkpoint {last_id}")
         
-        _logger.info(f"Found {len(lots_without_arrived_qty)} lots without arrived_quantity")
+        stats = {'total': total, 'processed': 0, 'updated': 0, 'done': False, 'rate': 0.0}
+        start = time.monotonic()
+        while True:
+            # For existing lots, use current on-hand quantity (internal and company transit locations)
+            # as arrived_quantity: this represents the best available data for existing lots
+            self.env.cr.execute("""
+                WITH batch AS (
+                    SELECT id FROM stock_lot
+                     WHERE id > %s AND COALESCE(arrived_quantity, 0) = 0
+                     ORDER BY id
+                     LIMIT %s
+                ), on_hand AS (
+                    SELECT quant.lot_id, SUM(quant.quantity) AS quantity
+                      FROM stock_quant quant
+                      JOIN stock_location location ON location.id = quant.location_id
+                     WHERE quant.lot_id IN (SELECT id FROM batch)
+                       AND (location.usage = 'internal'
+                            OR (location.usage = 'transit' AND location.company_id IS NOT NULL))
+                     GROUP BY quant.lot_id
+                ), updated AS (
+                    UPDATE stock_lot lot
+                       SET arrived_quantity = on_hand.quantity
+                      FROM on_hand
+                     WHERE lot.id = on_hand.lot_id AND on_hand.quantity > 0
+                 RETURNING lot.id
+                )
+                SELECT (SELECT MAX(id) FROM batch), (SELECT COUNT(*) FROM batch), (SELECT COUNT(*) FROM updated)
+            """, (last_id, chunk_size))
+            chunk_last_id, chunk_count, chunk_updated = self.env.cr.fetchone()
+            if not chunk_count:
+                stats['done'] = True
+                break
+            
+            last_id = chunk_last_id
+            stats['processed'] += chunk_count
+            stats['updated'] += chunk_updated
+            params.set_param(MIGRATION_CHECKPOINT_PARAM, last_id)
+            if commit:
+                self.env.cr.commit()
+            
+            elapsed = time.monotonic() - start
+            stats['rate'] = stats['processed'] / elapsed if elapsed else 0.0
+            _logger.info(
+                f"Arrived quantity migration: {stats['processed']}/{total} lots processed, "
+                f"{stats['updated']} updated, {stats['rate']:.0f} lots/s (checkpoint {last_id})"
+            )
+            if time_limit and elapsed > time_limit:
+                break
         
-        for lot in lots_without_arrived_qty:
-            try:
-                # For existing lots, use current product_qty as arrived_quantity
-                # This represents the best available data for existing lots
-                lot.sudo().write({'arrived_quantity': lot.product_qty})
-                _logger.info(f"Migrated lot {lot.name}: set arrived_quantity to {lot.product_qty}")
-            except Exception as e:
-                _logger.error(f"Failed to migrate lot {lot.name}: {e}")
+        if stats['done']:
+            # Start from scratch next time, lots created later may need migrating too
+            params.set_param(MIGRATION_CHECKPOINT_PARAM, 0)
+        self.invalidate_model(['arrived_quantity'])
         
-        _logger.info("=== MIGRATION COMPLETE ===")
+        _logger.info("=== MIGRATION COMPLETE ===" if stats['done'] else "=== MIGRATION PAUSED ===")
+        return stats
+    
+    @api.model
+    def _cron_migrate_existing_lots_arrived_quantity(self):
+        """Scheduled migration: commits after every chunk and re-triggers itself until done"""
+        stats = self._migrate_existing_lots_arrived_quantity(commit=True, time_limit=MIGRATION_CRON_TIME_LIMIT)
+        if not stats['done']:
+            self.env.ref('custom_rsfp_module.ir_cron_migrate_arrived_quantity')._trigger()
     
     def action_manual_migration(self):
         """Manual action to run migration for existing lots (can be called from UI)"""
-        self._migrate_existing_lots_arrived_quantity()
+        stats = self._migrate_existing_lots_arrived_quantity()
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
                 'title': 'Migration Complete',
-                'message': 'Arrived quantity has been updated for existing lots.',
+                'message': (
+                    f"Arrived quantity has been updated for {stats['updated']} of "
+                    f"{stats['processed']} existing lots ({stats['rate']:.0f} lots/s)."
+                ),
                 'type': 'success',
                 'sticky': False,
             }
         }
     
+    @api.model
+    def _find_negative_lot_quants(self):
+        """Find all negative lot quants in DS/ and PA/ internal locations, grouped by lot.
+
+        Returns a list of (lot_id, product_id, destination_id, quant_ids, location_ids, quantity)
+        from one grouped query. The destination is the lot's receipt destination, or that of
+        its root lot for child lots; it is None when no receipt provenance is known.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT quant.lot_id,
+                   quant.product_id,
+                   COALESCE(lot.receipt_location_dest_id, root.receipt_location_dest_id),
+                   array_agg(quant.id ORDER BY quant.id),
+                   array_agg(quant.location_id ORDER BY quant.id),
+                   SUM(quant.quantity)
+              FROM stock_quant quant
+              JOIN stock_location location ON location.id = quant.location_id
+              JOIN stock_lot lot ON lot.id = quant.lot_id
+         LEFT JOIN stock_lot root ON root.id = split_part(lot.parent_path, '/', 1)::int
+             WHERE quant.quantity < 0
+               AND location.usage = 'internal'
+               AND (location.complete_name LIKE 'DS/%%' OR location.complete_name LIKE 'PA/%%')
+          GROUP BY quant.lot_id, quant.product_id, lot.receipt_location_dest_id, root.receipt_location_dest_id
+          ORDER BY quant.lot_id
+        """)
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _repair_negative_lot_quants(self, dry_run=False, chunk_size=REPAIR_CHUNK_SIZE, commit=False):
+        """Move the negative quantities of lots in DS/PA locations to the lots' receipt destinations.
+
+        Same correction as the sorting report's inventory fix, for all lots at once: the negative
+        quants are zeroed and their total is taken from the destination location instead. Lots
+        are fixed in chunks (committed one by one when ``commit`` is set); with ``dry_run`` nothing
+        is written. Returns statistics and one summary line per lot.
+        """
+        start = time.monotonic()
+        groups = self._find_negative_lot_quants()
+        stats = {
+            'lots': len(groups),
+            'quants': sum(len(quant_ids) for _lot, _product, _dest, quant_ids, _locations, _qty in groups),
+            'quantity': -sum(quantity for _lot, _product, _dest, _quants, _locations, quantity in groups),
+            'fixed_lots': 0,
+            'unresolved_lots': 0,
+            'duration': 0.0,
+            'rate': 0.0,
+            'lines': [],
+        }
+
+        # Read the names shown in the summary in one go
+        lots = self.browse([group[0] for group in groups])
+        location_ids = {location_id for group in groups for location_id in group[4]}
+        location_ids.update(group[2] for group in groups if group[2])
+        locations = self.env['stock.location'].browse(location_ids)
+        lot_names = dict(zip(lots.ids, lots.mapped('name')))
+        location_names = {location.id: location.complete_name for location in locations}
+
+        for chunk_start in range(0, len(groups), chunk_size):
+            chunk = groups[chunk_start:chunk_start + chunk_size]
+            fixable = []
+            for lot_id, product_id, destination_id, quant_ids, source_ids, quantity in chunk:
+                sources = ', '.join(sorted({location_names[source_id] for source_id in source_ids}))
+                if not destination_id or destination_id in source_ids:
+                    stats['unresolved_lots'] += 1
+                    reason = 'no receipt destination known' if not destination_id else 'negative in its receipt destination'
+                    stats['lines'].append(f"{lot_names[lot_id]}: {-quantity:.2f} in {sources} - {reason}, skipped")
+                    continue
+                stats['lines'].append(f"{lot_names[lot_id]}: {-quantity:.2f} from {sources} to {location_names[destination_id]}")
+                fixable.append((lot_id, product_id, destination_id, quant_ids, quantity))
+
+            if not dry_run and fixable:
+                # Zero the negative quants, then take their total from each lot's destination
+                self.env.cr.execute(
+                    "UPDATE stock_quant SET quantity = 0 WHERE id IN %s",
+                    (tuple(quant_id for fix in fixable for quant_id in fix[3]),)
+                )
+                self.env['stock.quant'].invalidate_model(['quantity'])
+                for lot_id, product_id, destination_id, _quant_ids, quantity in fixable:
+                    self.env['stock.quant']._update_available_quantity(
+                        self.env['product.product'].browse(product_id),
+                        self.env['stock.location'].browse(destination_id),
+                        quantity,
+                        lot_id=self.browse(lot_id)
+                    )
+                if commit:
+                    self.env.cr.commit()
+            stats['fixed_lots'] += len(fixable)
+
+        stats['duration'] = time.monotonic() - start
+        stats['rate'] = stats['lots'] / stats['duration'] if stats['duration'] else 0.0
+        _logger.info(
+            f"Negative lot quant repair{' (dry run)' if dry_run else ''}: {stats['fixed_lots']} lots fixed, "
+            f"{stats['unresolved_lots']} unresolved, {stats['quants']} quants, "
+            f"{stats['quantity']:.2f} units, {stats['rate']:.0f} lots/s"
+        )
+        return stats
+
+    @api.model
+    def _cron_repair_negative_lot_quants(self):
+        """Scheduled repair of negative lot quants, committing after every chunk"""
+        self._repair_negative_lot_quants(commit=True)
+
+    def _get_root_lot(self):
+        """Return the root lot of this lot's genealogy, read from parent_path without extra queries"""
+        self.ensure_one()
+        lot = self._origin
+        if not lot.parent_path:
+            return lot
+        return self.browse(int(lot.parent_path.split('/', 1)[0]))
+
+    def _reserve_child_indexes(self, count=1):
+        """Reserve ``count`` consecutive child numbers of this lot and return the first one.
+
+        The counter is incremented with a single UPDATE ... RETURNING on the lot row, so concurrent
+        creations never get the same numbers. Lots split before the counter existed start after
+        the highest number found in their child lot names.
+        """
+        self.ensure_one()
+        floor = 1
+        self.flush_recordset(['next_child_index'])
+        if not self.next_child_index:
+            floor = self._get_legacy_next_child_index()
+
+        self.env.cr.execute("""
+            UPDATE stock_lot
+               SET next_child_index = GREATEST(COALESCE(next_child_index, 0), %s) + %s
+             WHERE id = %s
+         RETURNING next_child_index - %s
+        """, (floor, count, self.id, count))
+        first_index = self.env.cr.fetchone()[0]
+        self.invalidate_recordset(['next_child_index'])
+        return first_index
+
+    def _get_legacy_next_child_index(self):
+        """Next child number derived from the names of existing child lots (pattern: parent_name-NUMBER)"""
+        self.ensure_one()
+        pattern_prefix = f"{self.name}-"
+        existing_names = self.search([
+            ('name', '=like', f"{pattern_prefix}%"),
+            ('parent_lot_id', '=', self.id)
+        ]).mapped('name')
+
+        max_number = 0
+        for name in existing_names:
+            # Extract the first number after the parent name (A-1-2 -> 1 for grandchildren)
+            suffix = name[len(pattern_prefix):].split('-')[0]
+            try:
+                max_number = max(max_number, int(suffix))
+            except ValueError:
+                continue
+        return max_number + 1
+
+    def _plan_drawdown(self, quantity):
+        """Plan how to take ``quantity`` out of this lot's internal stock.
+
+        All positive quants of the lot are read (and locked) in one query and consumed oldest
+        first, by (in_date, id). Returns ``(allocations, shortfall)`` where allocations is a list
+        of (quant_id, location_id, quantity) and shortfall the quantity no quant could cover.
+        """
+        self.ensure_one()
+        self.env['stock.quant'].flush_model(['lot_id', 'location_id', 'quantity', 'in_date'])
+        self.env.cr.execute("""
+            SELECT quant.id, quant.location_id, quant.quantity
+              FROM stock_quant quant
+              JOIN stock_location location ON location.id = quant.location_id
+             WHERE quant.lot_id = %s
+               AND quant.quantity > 0
+               AND location.usage = 'internal'
+             ORDER BY quant.in_date, quant.id
+               FOR NO KEY UPDATE OF quant
+        """, (self.id,))
+
+        allocations = []
+        remaining = quantity
+        for quant_id, location_id, available in self.env.cr.fetchall():
+            if remaining <= 0:
+                break
+            taken = min(available, remaining)
+            allocations.append((quant_id, location_id, taken))
+            remaining -= taken
+        return allocations, max(remaining, 0.0)
+
+    def _apply_drawdown(self, quantity, fallback_location):
+        """Take ``quantity`` out of this lot's internal stock across all its locations.
+
+        The planned decrements are applied to the quants in a single UPDATE. Any shortfall is
+        taken from the oldest location of the lot, or from ``fallback_location`` when the lot
+        has no stock left, as before. Returns the locations the stock was taken from.
+        """
+        self.ensure_one()
+        if quantity <= 0:
+            return self.env['stock.location']
+
+        allocations, shortfall = self._plan_drawdown(quantity)
+        if allocations:
+            self.env.cr.execute("""
+                UPDATE stock_quant quant
+                   SET quantity = quant.quantity - drawdown.quantity
+                  FROM unnest(%s::int[], %s::numeric[]) AS drawdown(quant_id, quantity)
+                 WHERE quant.id = drawdown.quant_id
+            """, ([quant_id for quant_id, _location_id, _qty in allocations],
+                  [qty for _quant_id, _location_id, qty in allocations]))
+            self.env['stock.quant'].invalidate_model(['quantity'])
+            self.invalidate_recordset(['product_qty'])
+
+        locations = self.env['stock.location'].browse([location_id for _quant_id, location_id, _qty in allocations])
+        if shortfall:
+            shortfall_location = locations[:1] or fallback_location
+            self.env['stock.quant']._update_available_quantity(
+                self.product_id, shortfall_location, -shortfall, lot_id=self
+            )
+            locations |= shortfall_location
+
+        get_tracer(self.env, 'stock.lot')(
+            "Drew %s from lot %s over %s quants (shortfall %s)", quantity, self.id, len(allocations), shortfall
+        )
+        return locations
+
+    def action_view_lot_genealogy(self):
+        """Action to view every lot descending from this lot's root lot"""
+        self.ensure_one()
+        root_lot = self._get_root_lot()
+
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f'Lot Genealogy: {root_lot.name}',
+            'res_model': 'stock.lot',
+            'domain': [('id', 'child_of', root_lot.id)],
+            'view_mode': 'tree,form',
+            'target': 'current',
+            'context': {'create': False},
+        }
+
     def action_view_parent_lot(self):
         """Action to view the parent lot"""
         self.ensure_one()
@@ -168,76 +530,51 @@ class StockLot(models.Model):
     @api.model
     def default_get(self, fields_list):
         """Override to provide custom default lot name"""
-        _logger.info("=== LOT DEFAULT_GET CALLED ===")
-        _logger.info(f"Context: {self._context}")
+        trace = get_tracer(self.env, 'stock.lot')
+        trace("=== LOT DEFAULT_GET CALLED ===")
+        trace("Context: %s", self._context)
         
         res = super(StockLot, self).default_get(fields_list)
-        _logger.info(f"Super result: {res}")
+        trace("Super result: %s", res)
         
         # Only generate if 'name' is in the requested fields
         if 'name' in fields_list:
             product_id = self._context.get('default_product_id') or self._context.get('product_id')
-            _logger.info(f"Product ID from context: {product_id}")
+            trace("Product ID from context: %s", product_id)
             
             if product_id:
-                custom_name = self._generate_lot_name(product_id)
-                _logger.info(f"Generated custom name: {custom_name}")
+                custom_name = self._get_form_lot_name(product_id)
+                trace("Generated custom name: %s", custom_name)
                 if custom_name:
                     res['name'] = custom_name
             else:
-                _logger.info("No product_id in context - will be set via onchange")
+                trace("No product_id in context - will be set via onchange")
         
-        _logger.info(f"Final result: {res}")
+        trace("Final result: %s", res)
         return res
 
     @api.model
     def _generate_lot_name(self, product_id):
         """Generate lot name with format: ABBR-DDMMYY-XXXX"""
-        _logger.info(f"=== GENERATE_LOT_NAME called with product_id: {product_id} ===")
-        
-        if not product_id:
-            _logger.info("No product_id provided")
-            return False
-
-        try:
-            product = self.env['product.product'].browse(product_id)
-            if not product.exists():
-                _logger.info("Product does not exist")
-                return False
-            
-            _logger.info(f"Product found: {product.name}")
-            abbreviation = product.product_tmpl_id.lot_abbreviation or 'XX'
-            _logger.info(f"Abbreviation: {abbreviation}")
-            
-            today = fields.Date.today()
-            date_str = today.strftime('%d%m%y')
-            _logger.info(f"Date string: {date_str}")
-            
-            # Get the next sequence number for today
-            sequence_code = 'parent.lot.daily.sequence'
-            seq_number = self.env['ir.sequence'].next_by_code(sequence_code)
-            _logger.info(f"Sequence number: {seq_number}")
-            
-            if not seq_number:
-                _logger.error("Sequence not found!")
-                return f"{abbreviation}-{date_str}-ERROR"  # Return something rather than None
-            
-            # Format: ABBR-DDMMYY-XXXX (e.g., ABC-161025-0001)
-            lot_name = f"{abbreviation}-{date_str}-{seq_number}"
-            _logger.info(f"Final lot name: {lot_name}")
-            return lot_name
-            
-        except Exception as e:
-            _logger.error(f"Error generating lot name: {e}")
-            return f"ERR-{fields.Date.today().strftime('%d%m%y')}-001"  # Fallback name
-    
-    
+        return self.env['custom.lot.naming']._generate_name(product_id)
+
+    @api.model
+    def _is_lot_name_preview(self, name):
+        """Check whether a lot name is a preview that still needs its sequence number"""
+        return self.env['custom.lot.naming']._is_preview(name)
+
+    @api.model
+    def _get_form_lot_name(self, product_id):
+        """Lot name proposed by forms: a preview in deferred mode, otherwise a real name"""
+        return self.env['custom.lot.naming']._get_form_name(product_id)
 
     @api.onchange('product_id')
     def _onchange_product_id_generate_lot(self):
         """Generate lot name when product is selected"""
-        _logger.info(f"=== LOT ONCHANGE TRIGGERED === Product: {self.product_id.name if self.product_id else 'None'}")
-        _logger.info(f"Current name: {self.name}")
+        trace = get_tracer(self.env, 'stock.lot')
+        if trace:
+            trace("=== LOT ONCHANGE TRIGGERED === Product: %s", self.product_id.display_name)
+            trace("Current name: %s", self.name)
         
         if self.product_id:
             # Check if current name is the default Odoo sequence (starts with numbers)
@@ -246,81 +583,162 @@ class StockLot(models.Model):
                 not self.name or 
                 self.name.isdigit() or  # Pure numbers like "0000014"
                 self.name.startswith('LOT/') or  # Default LOT sequence
-                self.name == ''
+                self.name == '' or
+                self._is_lot_name_preview(self.name)  # Preview of another product
             )
             
-            _logger.info(f"Should replace name: {should_replace}")
+            trace("Should replace name: %s", should_replace)
             
             if should_replace:
-                generated_name = self._generate_lot_name(self.product_id.id)
-                _logger.info(f"Generated name: {generated_name}")
+                generated_name = self._get_form_lot_name(self.product_id.id)
+                trace("Generated name: %s", generated_name)
                 if generated_name:
                     self.name = generated_name
-                    _logger.info(f"Name updated to: {self.name}")
 
     def _get_purchase_order_info(self):
         """Get purchase order information for parent lots"""
         self.ensure_one()
-        
-        # Search for purchase order through stock moves  
-        move_lines = self.env['stock.move.line'].search([
-            ('lot_id', '=', self.id),
-            ('state', '=', 'done'),
-            ('move_id.purchase_line_id', '!=', False)
-        ], limit=1)
-        
-        if move_lines and move_lines.move_id.purchase_line_id:
-            po_line = move_lines.move_id.purchase_line_id
-            po = po_line.order_id
-            
-            # Get received date from picking
-            received_date = 'N/A'
-            if move_lines.picking_id and move_lines.picking_id.date_done:
-                received_date = move_lines.picking_id.date_done.strftime('%d/%m/%Y')
-            
-            return {
+        return self._get_purchase_order_info_batch().get(self.id, {})
+
+    def _get_purchase_order_info_batch(self):
+        """Purchase order information of several lots at once, by lot id (lots without receipt are left out).
+
+        Only the stored receipt_* fields are read, so the ORM fetches them for all lots together.
+        """
+        info_by_lot = {}
+        for lot in self:
+            po_line = lot.receipt_purchase_line_id
+            if not po_line:
+                continue
+            po = lot.receipt_purchase_order_id
+            info_by_lot[lot.id] = {
                 'po_number': po.name,
-                'vendor': po.partner_id.name,
+                'vendor': lot.receipt_partner_id.name,
                 'order_date': po.date_order.strftime('%d/%m/%Y') if po.date_order else 'N/A',
-                'received_date': received_date,
+                'received_date': lot.receipt_date.strftime('%d/%m/%Y') if lot.receipt_date else 'N/A',
                 'original_qty': po_line.product_qty,
                 'uom': po_line.product_uom.name,
             }
-        return {}
+        return info_by_lot
+    
+    @api.model
+    def _capture_receipt_provenance(self, move_lines):
+        """Store PO, vendor, received date and destination on the lots of done purchase receipt lines.
+
+        Lots keep the provenance of their first receipt; lots received through the same
+        move line values are written together.
+        """
+        provenance_by_lot = {}
+        for move_line in move_lines.sorted('id'):
+            lot = move_line.lot_id
+            po_line = move_line.move_id.purchase_line_id
+            if not lot or not po_line or move_line.state != 'done' or lot.receipt_purchase_line_id:
+                continue
+            provenance_by_lot.setdefault(lot, (
+                po_line.id,
+                po_line.order_id.id,
+                po_line.order_id.partner_id.id,
+                move_line.picking_id.date_done or move_line.date,
+                move_line.location_dest_id.id,
+            ))
+        
+        lots_by_provenance = {}
+        for lot, provenance in provenance_by_lot.items():
+            lots_by_provenance.setdefault(provenance, self.browse())
+            lots_by_provenance[provenance] |= lot
+        
+        for (po_line_id, po_id, partner_id, received_date, location_dest_id), lots in lots_by_provenance.items():
+            lots.sudo().write({
+                'receipt_purchase_line_id': po_line_id,
+                'receipt_purchase_order_id': po_id,
+                'receipt_partner_id': partner_id,
+                'receipt_date': received_date,
+                'receipt_location_dest_id': location_dest_id,
+            })
+    
+    @api.model
+    def _backfill_receipt_provenance(self):
+        """Fill the receipt provenance of existing lots from their first done purchase move line, in one statement"""
+        self.env.flush_all()
+        self.env.cr.execute("""
+            WITH receipt AS (
+                SELECT DISTINCT ON (move_line.lot_id)
+                       move_line.lot_id,
+                       po_line.id AS po_line_id,
+                       po.id AS po_id,
+                       po.partner_id,
+                       COALESCE(picking.date_done, move_line.date) AS received_date,
+                       move_line.location_dest_id
+                  FROM stock_move_line move_line
+                  JOIN stock_move move ON move.id = move_line.move_id
+                  JOIN purchase_order_line po_line ON po_line.id = move.purchase_line_id
+                  JOIN purchase_order po ON po.id = po_line.order_id
+             LEFT JOIN stock_picking picking ON picking.id = move_line.picking_id
+                 WHERE move_line.lot_id IS NOT NULL
+                   AND move_line.state = 'done'
+              ORDER BY move_line.lot_id, move_line.id
+            )
+            UPDATE stock_lot lot
+               SET receipt_purchase_line_id = receipt.po_line_id,
+                   receipt_purchase_order_id = receipt.po_id,
+                   receipt_partner_id = receipt.partner_id,
+                   receipt_date = receipt.received_date,
+                   receipt_location_dest_id = receipt.location_dest_id
+              FROM receipt
+             WHERE lot.id = receipt.lot_id
+               AND lot.receipt_purchase_line_id IS NULL
+        """)
+        _logger.info(f"Backfilled receipt provenance on {self.env.cr.rowcount} lots")
+        self.invalidate_model([
+            'receipt_purchase_line_id', 'receipt_purchase_order_id', 'receipt_partner_id',
+            'receipt_date', 'receipt_location_dest_id',
+        ])
     
     def _get_processing_info(self):
         """Get processing information for child lots"""
         self.ensure_one()
-        
-        if not self.parent_lot_id:
+        return self._get_processing_info_batch().get(self.id, {})
+
+    def _get_processing_info_batch(self):
+        """Processing information of several child lots at once, by lot id (parent lots are left out).
+
+        The confirmed sorting reports of all parents and the confirmed quality reports of all
+        child lots are read in one search each; the first report by id is used, as before.
+        """
+        child_lots = self.filtered('parent_lot_id')
+        if not child_lots:
             return {}
-        
-        info = {
-            'sorted_date': 'N/A',
-            'tested_date': 'N/A',
-            'sorting_report_name': 'N/A',  
-        }
-        
-        # Get sorting information
-        sorting_report = self.env['custom.sorting.report'].search([
-            ('parent_lot_id', '=', self.parent_lot_id.id),
+
+        sorting_by_parent = {}
+        for sorting_report in self.env['custom.sorting.report'].search([
+            ('parent_lot_id', 'in', child_lots.parent_lot_id.ids),
             ('state', '=', 'confirmed')
-        ], limit=1)
-        
-        if sorting_report:
-            info['sorted_date'] = sorting_report.sorting_date.strftime('%d/%m/%Y') if sorting_report.sorting_date else 'N/A'
-            info['sorting_report_name'] = sorting_report.name  # Set the report name
-        
-        # Get quality testing information
-        quality_report = self.env['custom.quality.report'].search([
-            ('child_lot_id', '=', self.id),
+        ], order='id'):
+            sorting_by_parent.setdefault(sorting_report.parent_lot_id.id, sorting_report)
+
+        quality_by_lot = {}
+        for quality_report in self.env['custom.quality.report'].search([
+            ('child_lot_id', 'in', child_lots.ids),
             ('state', '=', 'confirmed')
-        ], limit=1)
-        
-        if quality_report:
-            info['tested_date'] = quality_report.testing_date.strftime('%d/%m/%Y') if quality_report.testing_date else 'N/A'
-        
-        return info
+        ], order='id'):
+            quality_by_lot.setdefault(quality_report.child_lot_id.id, quality_report)
+
+        info_by_lot = {}
+        for lot in child_lots:
+            info = {
+                'sorted_date': 'N/A',
+                'tested_date': 'N/A',
+                'sorting_report_name': 'N/A',
+            }
+            sorting_report = sorting_by_parent.get(lot.parent_lot_id.id)
+            if sorting_report:
+                info['sorted_date'] = sorting_report.sorting_date.strftime('%d/%m/%Y') if sorting_report.sorting_date else 'N/A'
+                info['sorting_report_name'] = sorting_report.name
+            quality_report = quality_by_lot.get(lot.id)
+            if quality_report:
+                info['tested_date'] = quality_report.testing_date.strftime('%d/%m/%Y') if quality_report.testing_date else 'N/A'
+            info_by_lot[lot.id] = info
+        return info_by_lot
     
     @api.model
     def action_set_arrived_quantity(self):
@@ -1,14 +1,18 @@
-from odoo import models, api # type: ignore
+from odoo import models, api, fields # type: ignore
 import logging
+from .tracing import get_tracer
 
 _logger = logging.getLogger(__name__)
 
+# Key of the per-transaction buffer of first lot arrivals ({lot_id: quantity}) in cr.precommit.data
+LOT_ARRIVALS_BUFFER = 'custom_rsfp_module.lot_arrivals'
+
 class StockQuant(models.Model):
     _inherit = 'stock.quant'
     
     @api.model
     def _update_available_quantity(self, product_id, location_id, quantity=0, lot_id=None, package_id=None, owner_id=None, in_date=None, reserved_quantity=0):
-        """Override to set arrived_quantity when first adding stock to a lot"""
+        """Override to record the first stock added to a lot as its arrived_quantity"""
         
         # Call the original method first
         result = super(StockQuant, self)._update_available_quantity(
@@ -19,12 +23,63 @@ class StockQuant(models.Model):
         
         # If we have a lot_id and this is a positive quantity addition
         if lot_id and quantity > 0 and hasattr(location_id, 'usage') and location_id.usage == 'internal':
-            try:
-                # Check if this is the first quantity assignment to the lot
-                if hasattr(lot_id, '_set_arrived_quantity_if_needed'):
-                    lot_id._set_arrived_quantity_if_needed(quantity)
-                    _logger.info(f"Attempted to set arrived_quantity for lot {lot_id.name} with qty {quantity}")
-            except Exception as e:
-                _logger.warning(f"Failed to set arrived_quantity for lot {lot_id.name if lot_id else 'unknown'}: {e}")
+            # Lots created with their arrived_quantity (e.g. child lots) need nothing more
+            if not lot_id.arrived_quantity:
+                self._buffer_lot_first_arrival(lot_id, quantity)
+        
+        return result
+
+    @api.model
+    def _create_new_lot_quants(self, entries):
+        """Create the quants of lots that have no stock yet, from (product, location, quantity, lot) tuples.
+
+        Equivalent to calling _update_available_quantity for each lot, without gathering
+        existing quants first. Lots are expected to carry their arrived_quantity already.
+        """
+        in_date = fields.Datetime.now()
+        return self.sudo().create([{
+            'product_id': product.id,
+            'location_id': location.id,
+            'quantity': quantity,
+            'lot_id': lot.id,
+            'in_date': in_date,
+        } for product, location, quantity, lot in entries])
+
+    @api.model
+    def _buffer_lot_first_arrival(self, lot, quantity):
+        """Remember the first arrival of a lot in this transaction, to be applied just before commit.
+
+        The value is put in the ORM cache right away, so readers of the same transaction see it
+        before it is written to the database.
+        """
+        precommit = self.env.cr.precommit
+        arrivals = precommit.data.setdefault(LOT_ARRIVALS_BUFFER, {})
+        if not arrivals:
+            precommit.add(self._flush_lot_first_arrivals)
+        # Only the first arrival of each lot counts
+        if lot.id not in arrivals:
+            arrivals[lot.id] = quantity
+            field = lot._fields['arrived_quantity']
+            self.env.cache.set(lot, field, field.convert_to_cache(quantity, lot))
+        get_tracer(self.env, 'stock.quant')("Buffered arrived_quantity %s for lot %s", quantity, lot.id)
+
+    @api.model
+    def _flush_lot_first_arrivals(self):
+        """Set arrived_quantity of all buffered lots in one statement, only where it is still zero.
+
+        Runs before commit, and earlier from stock.move._action_done so the buffered values
+        survive cache invalidations in the rest of the transaction.
+        """
+        arrivals = self.env.cr.precommit.data.pop(LOT_ARRIVALS_BUFFER, {})
+        if not arrivals:
+            return
         
-        return result
\ No newline at end of file
+        self.env.cr.execute("""
+            UPDATE stock_lot lot
+               SET arrived_quantity = arrival.quantity
+              FROM unnest(%s::int[], %s::numeric[]) AS arrival(lot_id, quantity)
+             WHERE lot.id = arrival.lot_id
+               AND COALESCE(lot.arrived_quantity, 0) = 0
+        """, (list(arrivals), list(arrivals.values())))
+        self.env['stock.lot'].invalidate_model(['arrived_quantity'])
+        _logger.debug(f"Set arrived_quantity on {self.env.cr.rowcount} of {len(arrivals)} buffered lots")
@@ -0,0 +1,49 @@
+import logging
+import random
+
+# This file provides sampled tracing for the hot paths of the module (lot and move line creation, sequences).
+# Tracing is switched on per model with a system parameter holding its sample rate, for example:
+#   custom_rsfp_module.trace.stock.lot = 1      -> trace every stock.lot call
+#   custom_rsfp_module.trace.stock.move.line = 0.05 -> trace 5% of stock.move.line calls
+# A missing or zero parameter disables tracing. The sampling decision is taken once per call by get_tracer(), and
+# messages use lazy %-formatting, so nothing is formatted unless the call is actually traced. Records are emitted on the "odoo.addons.custom_rsfp_module.trace.<model>" loggers.
+
+_TRACE_LOGGER = 'odoo.addons.custom_rsfp_module.trace'
+
+def _get_sample_rate(env, model_name):
+    """Return the trace sample rate configured for a model (0.0 when tracing is off)"""
+    value = env['ir.config_parameter'].sudo().get_param(f'custom_rsfp_module.trace.{model_name}')
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+class _Tracer:
+    """Callable logging a trace message with lazy %-formatting; does nothing when disabled"""
+    __slots__ = ('logger',)
+
+    def __init__(self, logger=None):
+        self.logger = logger
+
+    def __bool__(self):
+        return self.logger is not None
+
+    def __call__(self, message, *args):
+        if self.logger is not None:
+            self.logger.info(message, *args)
+
+_DISABLED_TRACER = _Tracer()
+
+def get_tracer(env, model_name):
+    """Return the tracer for one call on a model, sampled once so a traced call is traced in full"""
+    logger = logging.getLogger(f"{_TRACE_LOGGER}.{model_name}")
+    if not logger.isEnabledFor(logging.INFO):
+        return _DISABLED_TRACER
+
+    rate = _get_sample_rate(env, model_name)
+    if rate <= 0.0 or (rate < 1.0 and random.random() >= rate):
+        return _DISABLED_TRACER
+
+    return _Tracer(logger)
@@ -1 +1,4 @@
-from . import quality_report
\ No newline at end of file
+from . import report_sorting
+from . import report_quality
+from . import report_child_lot_creation
+from . import report_lot_label
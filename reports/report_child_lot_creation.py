@@ -0,0 +1,53 @@
+from odoo import models, api # type: ignore
+
+# This file provides the data of the child lot creation report (custom_rsfp_module.report_child_lot_creation_document_detail).
+# Lines and created child lots are read once for all reports; each child lot is matched to its line through a dictionary.
+
+class ReportChildLotCreationDocumentDetail(models.AbstractModel):
+    _name = 'report.custom_rsfp_module.report_child_lot_creation_document_detail'
+    _description = 'Child Lot Creation Report Data'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env['custom.child.lot.creation'].browse(docids)
+
+        # product_qty is computed for all created lots together
+        lines = docs.child_lot_lines
+        created_lots = lines.created_lot_id
+        lot_quantities = dict(zip(created_lots.ids, created_lots.mapped('product_qty')))
+
+        report_data = {}
+        for doc in docs:
+            line_rows = []
+            child_lots = []
+            for line in doc.child_lot_lines:
+                location_name = line.location_id.display_name if line.location_id else False
+                line_rows.append({
+                    'quantity': line.quantity,
+                    'location_name': location_name,
+                    'notes': line.notes,
+                    'created': bool(line.created_lot_id),
+                })
+                lot = line.created_lot_id
+                if lot:
+                    child_lots.append({
+                        'name': lot.name,
+                        'product_name': lot.product_id.name,
+                        'quantity': lot_quantities[lot.id],
+                        'uom_name': lot.product_uom_id.name,
+                        'location_name': location_name,
+                        'notes': line.notes,
+                    })
+
+            report_data[doc.id] = {
+                'lines': line_rows,
+                'created_count': len(child_lots),
+                'child_lots': child_lots,
+            }
+
+        return {
+            'doc_ids': docids,
+            'doc_model': 'custom.child.lot.creation',
+            'docs': docs,
+            'report_data': report_data,
+        }
@@ -0,0 +1,27 @@
+from odoo import models, api # type: ignore
+
+# This file provides the data of the lot labels (custom_rsfp_module.custom_lot_label_template).
+# Purchase and processing information of all printed lots is fetched here once, whatever the number of copies per lot.
+
+class ReportCustomLotLabel(models.AbstractModel):
+    _name = 'report.custom_rsfp_module.custom_lot_label_template'
+    _description = 'Lot Label Data'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env['stock.lot'].browse(docids)
+
+        purchase_info = docs.filtered(lambda lot: not lot.parent_lot_id)._get_purchase_order_info_batch()
+        processing_info = docs._get_processing_info_batch()
+
+        return {
+            'doc_ids': docids,
+            'doc_model': 'stock.lot',
+            'docs': docs,
+            'label_data': {
+                lot.id: {
+                    'purchase_info': purchase_info.get(lot.id, {}),
+                    'processing_info': processing_info.get(lot.id, {}),
+                } for lot in docs
+            },
+        }
@@ -0,0 +1,47 @@
+from odoo import models, api # type: ignore
+
+# This file provides the data of the quality report (custom_rsfp_module.report_quality_document_detail).
+# Lot quantities and the test image grid are computed here for all reports at once.
+
+# Number of test images per row of the image grid
+IMAGES_PER_ROW = 3
+
+class ReportQualityDocumentDetail(models.AbstractModel):
+    _name = 'report.custom_rsfp_module.report_quality_document_detail'
+    _description = 'Quality Report Data'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env['custom.quality.report'].browse(docids)
+
+        # Read the images of all reports together
+        images_by_report = {}
+        for image in docs.image_ids:
+            images_by_report.setdefault(image.quality_report_id.id, []).append(image)
+
+        # Quantities of all child lots in one grouped query, as stock.lot.product_qty computes them
+        lot_qty = {
+            lot.id: quantity
+            for lot, quantity in self.env['stock.quant']._read_group(
+                [('lot_id', 'in', docs.child_lot_id.ids), ('location_id.usage', 'in', ['internal', 'transit'])],
+                ['lot_id'], ['quantity:sum'],
+            )
+        }
+
+        report_data = {}
+        for doc in docs:
+            doc_images = images_by_report.get(doc.id, [])
+            report_data[doc.id] = {
+                'lot_qty': lot_qty.get(doc.child_lot_id.id, 0.0),
+                'image_rows': [
+                    doc_images[index:index + IMAGES_PER_ROW]
+                    for index in range(0, len(doc_images), IMAGES_PER_ROW)
+                ],
+            }
+
+        return {
+            'doc_ids': docids,
+            'doc_model': 'custom.quality.report',
+            'docs': docs,
+            'report_data': report_data,
+        }
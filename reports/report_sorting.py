@@ -0,0 +1,58 @@
+from odoo import models, api # type: ignore
+
+# This file provides the data of the sorting report (custom_rsfp_module.report_sorting_document_detail).
+# Everything the template shows per report (grade rows, child lot labels) is computed here for all reports at once.
+
+SORTING_GRADES = [
+    ('qty_grade_a', 'Grade A'),
+    ('qty_grade_b', 'Grade B'),
+    ('qty_grade_c', 'Grade C'),
+    ('qty_grade_dc', 'Discarded'),
+]
+
+class ReportSortingDocumentDetail(models.AbstractModel):
+    _name = 'report.custom_rsfp_module.report_sorting_document_detail'
+    _description = 'Sorting Report Data'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env['custom.sorting.report'].browse(docids)
+
+        # Child lots of all confirmed reports in one search (same criteria as child_lot_ids)
+        processed = docs.filtered(lambda doc: doc.state == 'confirmed' and doc.inventory_processed and doc.parent_lot_id)
+        child_lots_by_parent = {}
+        if processed:
+            child_lots = self.env['stock.lot'].search([
+                ('parent_lot_id', 'in', processed.parent_lot_id.ids),
+                ('ref', 'in', processed.parent_lot_id.mapped('name')),
+            ])
+            # product_qty is computed for all child lots together
+            for lot in child_lots:
+                if lot.ref != lot.parent_lot_id.name:
+                    continue
+                child_lots_by_parent.setdefault(lot.parent_lot_id.id, []).append({
+                    'name': lot.name,
+                    'product_name': lot.product_id.name,
+                    'parent_name': lot.parent_lot_id.name,
+                    'quantity': lot.product_qty,
+                    'uom_name': lot.product_uom_id.name,
+                })
+
+        report_data = {}
+        for doc in docs:
+            parent_qty = doc.parent_qty_total
+            report_data[doc.id] = {
+                'grade_rows': [{
+                    'label': label,
+                    'quantity': doc[field_name],
+                    'percentage': round((doc[field_name] / parent_qty) * 100, 1) if parent_qty > 0 else 0.0,
+                } for field_name, label in SORTING_GRADES if doc[field_name] > 0],
+                'child_lots': child_lots_by_parent.get(doc.parent_lot_id.id, []) if doc in processed else [],
+            }
+
+        return {
+            'doc_ids': docids,
+            'doc_model': 'custom.sorting.report',
+            'docs': docs,
+            'report_data': report_data,
+        }